@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from foodgram.db import check_connections
+        from . import signals  # noqa: F401
+        from .metrics import instrument_serializers
+
+        instrument_serializers()
+        request_started.connect(check_connections)
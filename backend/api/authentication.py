@@ -0,0 +1,44 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+CACHE_KEY = "auth_token:{}"
+CACHE_TIMEOUT = 5 * 60
+
+
+def get_cache_key(key):
+    """Ключ кеша строится из хеша, сам токен в кеш не попадает."""
+    return CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_tokens(keys):
+    """Удаляет токены из общего кеша."""
+    cache.delete_many([get_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к базе на каждый вызов API.
+    Пара пользователь–токен ищется сначала в общем кеше Django и только
+    потом в базе. Записи удаляются при выходе, смене пароля и любом
+    другом сохранении пользователя. Кеш используется только общий
+    для всех воркеров и без копий в памяти процесса: иначе отозванный
+    токен принимался бы воркерами, которые не обрабатывали выход.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.SHARED_CACHE:
+            return super().authenticate_credentials(key)
+        cache_key = get_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(cache_key, credentials, CACHE_TIMEOUT)
+        user, token = credentials
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                "Пользователь неактивен или удалён.")
+        return user, token
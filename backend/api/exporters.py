@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+EXPORTERS = {}
+
+
+def register(file_format, content_type):
+    """Регистрирует функцию выгрузки списка покупок в формате file_format."""
+    def decorator(func):
+        EXPORTERS[file_format] = (func, content_type)
+        return func
+    return decorator
+
+
+@register("txt", "text/plain; charset=utf-8")
+def export_txt(items):
+    yield "Список покупок: \n"
+    for name, measurement_unit, total in items:
+        yield f"{name} - {total} ({measurement_unit}) \n"
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+@register("csv", "text/csv; charset=utf-8")
+def export_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "measurement_unit", "amount"))
+    for item in items:
+        yield writer.writerow(item)
+
+
+@register("json", "application/json")
+def export_json(items):
+    separator = "["
+    for name, measurement_unit, total in items:
+        yield separator + json.dumps(
+            {
+                "name": name,
+                "measurement_unit": measurement_unit,
+                "amount": total,
+            },
+            ensure_ascii=False,
+        )
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+PDF_FONT = "ShoppingListFont"
+
+
+def get_pdf_font():
+    """
+    Регистрирует шрифт с кириллицей для PDF. Встроенные шрифты PDF
+    кириллицу не отображают, поэтому без шрифта формат недоступен.
+    """
+    font_path = getattr(settings, "SHOPPING_LIST_PDF_FONT", None)
+    if canvas is None or not font_path or not os.path.isfile(font_path):
+        return None
+    pdfmetrics.registerFont(TTFont(PDF_FONT, font_path))
+    return PDF_FONT
+
+
+if get_pdf_font() is not None:
+    @register("pdf", "application/pdf")
+    def export_pdf(items):
+        buffer = io.BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - 50
+        document.setFont(PDF_FONT, 16)
+        document.drawString(50, y, "Список покупок:")
+        document.setFont(PDF_FONT, 12)
+        for name, measurement_unit, total in items:
+            y -= 20
+            if y < 50:
+                document.showPage()
+                document.setFont(PDF_FONT, 12)
+                y = height - 50
+            document.drawString(
+                50, y, f"{name} - {total} ({measurement_unit})")
+        document.save()
+        yield buffer.getvalue()
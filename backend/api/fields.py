@@ -0,0 +1,86 @@
+import binascii
+import tempfile
+from uuid import uuid4
+
+from django.core.files import File
+from PIL import Image
+from recipes.images import (ALLOWED_FORMATS, MAX_IMAGE_PIXELS,
+                            MAX_IMAGE_SIZE, retry_thumbnails)
+from rest_framework import serializers
+
+DECODE_CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+
+
+class Base64ImageField(serializers.ImageField):
+    """
+    Изображение в base64. Данные декодируются частями во временный файл,
+    размер и число пикселей проверяются до полной обработки изображения.
+    """
+
+    default_error_messages = {
+        "invalid_image": "Загрузите корректное изображение.",
+        "too_large": "Размер изображения не должен превышать {max_size} байт.",
+        "too_many_pixels": "Изображение слишком большое.",
+    }
+
+    def decode(self, encoded):
+        if len(encoded) * 3 // 4 > MAX_IMAGE_SIZE:
+            self.fail("too_large", max_size=MAX_IMAGE_SIZE)
+        if any(char.isspace() for char in encoded[:DECODE_CHUNK_SIZE]):
+            encoded = "".join(encoded.split())
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        try:
+            for start in range(0, len(encoded), DECODE_CHUNK_SIZE):
+                file.write(binascii.a2b_base64(
+                    encoded[start:start + DECODE_CHUNK_SIZE]))
+        except binascii.Error:
+            file.close()
+            self.fail("invalid_image")
+        file.seek(0)
+        return file
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            return super().to_internal_value(data)
+        _, _, encoded = data.rpartition(";base64,")
+        file = self.decode(encoded)
+        try:
+            image = Image.open(file)
+            if image.width * image.height > MAX_IMAGE_PIXELS:
+                self.fail("too_many_pixels")
+            image_format = image.format
+            image.verify()
+        except (OSError, SyntaxError, Image.DecompressionBombError):
+            self.fail("invalid_image")
+        if image_format not in ALLOWED_FORMATS:
+            self.fail("invalid_image")
+        file.seek(0)
+        extension = image_format.lower().replace("jpeg", "jpg")
+        return File(file, name=f"{uuid4()}.{extension}")
+
+
+class RecipeImageField(serializers.ReadOnlyField):
+    """
+    Ссылка на изображение рецепта нужного размера.
+    Если миниатюра ещё не готова, возвращается оригинал,
+    а потерянная задача создания миниатюр запускается заново.
+    """
+
+    def __init__(self, size=None, **kwargs):
+        self.size = size
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        if not recipe.thumbnails:
+            retry_thumbnails(recipe.pk)
+        size = self.size or self.context.get("image_size")
+        name = (recipe.thumbnails or {}).get(size) or recipe.image.name
+        url = recipe.image.storage.url(name)
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -1,25 +1,66 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
-from recipes.models import Ingredient, Recipe
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+
+MEMBERSHIP_MODELS = {
+    "is_in_shopping_cart": ShoppingCart,
+    "is_favorited": Favourite,
+}
 
 
 class RecipeFilter(filters.FilterSet):
     """Фильтр рецептов"""
 
-    tags = filters.AllValuesMultipleFilter(field_name="tags__slug")
+    tags = filters.ModelMultipleChoiceFilter(
+        field_name="tags__slug",
+        to_field_name="slug",
+        queryset=Tag.objects.all(),
+        method="filter_tags",
+    )
     author = filters.CharFilter(lookup_expr="exact")
     is_in_shopping_cart = filters.BooleanFilter(
         field_name="is_in_shopping_cart", method="filter"
     )
     is_favorited = filters.BooleanFilter(
         field_name="is_favorited", method="filter")
+    search = filters.CharFilter(method="search_recipes")
+    ordering = filters.ChoiceFilter(
+        choices=(("popular", "Популярные"),), method="order")
 
     def filter(self, queryset, name, value):
-        """Метод фильтрации рецептов"""
-        if name == "is_in_shopping_cart" and value:
-            queryset = queryset.filter(
-                shopping_list_recipe__user=self.request.user)
-        if name == "is_favorited" and value:
-            queryset = queryset.filter(favorite_recipe__user=self.request.user)
+        """
+        Метод фильтрации рецептов.
+        Условие EXISTS не размножает строки и не требует distinct().
+        """
+        if not value:
+            return queryset
+        if self.request.user.is_anonymous:
+            return queryset.none()
+        return queryset.filter(Exists(
+            MEMBERSHIP_MODELS[name].objects.filter(
+                user=self.request.user, recipe=OuterRef("pk"))
+        ))
+
+    def filter_tags(self, queryset, name, tags):
+        """Рецепты хотя бы с одним из тегов, без дублей из-за JOIN."""
+        if not tags:
+            return queryset
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef("pk"), tag__in=tags)
+        ))
+
+    def search_recipes(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        if not value.strip():
+            return queryset
+        return queryset.search(value)
+
+    def order(self, queryset, name, value):
+        """Сортировка рецептов по сохранённым счётчикам популярности."""
+        if value == "popular":
+            queryset = queryset.order_by(
+                "-favorites_count", "-pub_date", "-id")
         return queryset
 
     class Meta:
@@ -29,6 +70,8 @@ class RecipeFilter(filters.FilterSet):
             "tags",
             "is_in_shopping_cart",
             "is_favorited",
+            "search",
+            "ordering",
         )
 
 
@@ -0,0 +1,43 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def stdlib_dumps(data, default):
+    return json.dumps(
+        data, default=default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def orjson_dumps(data, default):
+    # Даты отдаются в encoder DRF, чтобы формат не зависел от библиотеки
+    return orjson.dumps(
+        data, default=default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+    )
+
+
+def ujson_dumps(data, default):
+    return ujson.dumps(
+        data, default=default, ensure_ascii=False,
+        escape_forward_slashes=False,
+    ).encode()
+
+
+# Доступные библиотеки в порядке предпочтения: (dumps, loads, ошибка разбора)
+BACKENDS = {}
+if orjson is not None:
+    BACKENDS["orjson"] = (orjson_dumps, orjson.loads, orjson.JSONDecodeError)
+if ujson is not None:
+    BACKENDS["ujson"] = (ujson_dumps, ujson.loads, ValueError)
+BACKENDS["json"] = (stdlib_dumps, json.loads, json.JSONDecodeError)
+
+BACKEND = next(iter(BACKENDS))
@@ -0,0 +1,158 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from rest_framework.serializers import BaseSerializer
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+current_recorder = ContextVar("current_recorder", default=None)
+
+
+class Recorder:
+    """
+    Измерения одного запроса. Подключается к соединениям с базой через
+    execute_wrapper и считает запросы, время SQL и сам текст запросов,
+    если нужен журнал медленных запросов.
+    """
+
+    def __init__(self, capture_sql=False, capture_params=False):
+        self.capture_sql = capture_sql
+        self.capture_params = capture_params
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if self.capture_sql:
+                self.statements.append((
+                    duration, sql, params if self.capture_params else None))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            lines.append(
+                f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {total}")
+        return lines
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class Registry:
+    """
+    Метрики представлений в памяти процесса. Каждый воркер gunicorn
+    отдаёт свои значения, суммирование выполняет Prometheus.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, method, status, duration, recorder, size):
+        with self.lock:
+            metrics = self.views.get((view, method))
+            if metrics is None:
+                metrics = self.views[(view, method)] = ViewMetrics()
+            metrics.duration.observe(duration)
+            metrics.queries.observe(recorder.queries)
+            metrics.db_time += recorder.db_time
+            metrics.serializer_time += recorder.serializer_time
+            metrics.response_bytes += size
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = [
+            "# TYPE foodgram_request_duration_seconds histogram",
+            "# TYPE foodgram_request_queries histogram",
+            "# TYPE foodgram_request_db_seconds_total counter",
+            "# TYPE foodgram_request_serializer_seconds_total counter",
+            "# TYPE foodgram_response_bytes_total counter",
+            "# TYPE foodgram_requests_total counter",
+        ]
+        with self.lock:
+            for (view, method), metrics in sorted(self.views.items()):
+                labels = f'view="{view}",method="{method}"'
+                lines += metrics.duration.render(
+                    "foodgram_request_duration_seconds", labels)
+                lines += metrics.queries.render(
+                    "foodgram_request_queries", labels)
+                lines += [
+                    f"foodgram_request_db_seconds_total{{{labels}}} "
+                    f"{metrics.db_time:.6f}",
+                    f"foodgram_request_serializer_seconds_total{{{labels}}} "
+                    f"{metrics.serializer_time:.6f}",
+                    f"foodgram_response_bytes_total{{{labels}}} "
+                    f"{metrics.response_bytes}",
+                ]
+                lines += [
+                    f'foodgram_requests_total{{{labels},status="{status}"}} '
+                    f"{count}"
+                    for status, count in sorted(metrics.statuses.items())
+                ]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def instrument_serializers():
+    """
+    Оборачивает BaseSerializer.data, через которое представления получают
+    данные сериализаторов, и суммирует его время в текущем Recorder.
+    Вложенные сериализаторы вызываются через to_representation и отдельно
+    не учитываются.
+    """
+    data = BaseSerializer.data
+    if getattr(data.fget, "instrumented", False):
+        return
+
+    def timed_data(serializer):
+        recorder = current_recorder.get()
+        if recorder is None:
+            return data.fget(serializer)
+        recorder.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            recorder.serializer_depth -= 1
+            if not recorder.serializer_depth:
+                recorder.serializer_time += time.perf_counter() - started
+
+    timed_data.instrumented = True
+    BaseSerializer.data = property(timed_data)
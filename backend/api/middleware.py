@@ -0,0 +1,80 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import Recorder, current_recorder, registry
+
+logger = logging.getLogger("api.slow_requests")
+
+
+class MetricsMiddleware:
+    """
+    Измеряет каждый запрос: число SQL-запросов, время SQL, время
+    сериализаторов и размер ответа. Значения добавляются в заголовок
+    Server-Timing и в метрики для /api/metrics/. Запросы дольше
+    SLOW_REQUEST_THRESHOLD миллисекунд пишутся в журнал вместе с SQL.
+    Параметры запросов содержат токены и хеши паролей, они пишутся
+    только при включённом SLOW_REQUEST_LOG_PARAMS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(
+            settings, "SLOW_REQUEST_THRESHOLD", None)
+        self.log_params = getattr(settings, "SLOW_REQUEST_LOG_PARAMS", False)
+
+    def __call__(self, request):
+        recorder = Recorder(
+            capture_sql=self.slow_threshold is not None,
+            capture_params=self.log_params,
+        )
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        duration = time.perf_counter() - started
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(
+            self.get_view_name(request), request.method,
+            response.status_code, duration, recorder, size,
+        )
+        response["Server-Timing"] = self.get_server_timing(
+            recorder, duration)
+        if (self.slow_threshold is not None
+                and duration * 1000 >= self.slow_threshold):
+            self.log_slow_request(request, recorder, duration)
+        return response
+
+    def get_view_name(self, request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name
+
+    def get_server_timing(self, recorder, duration):
+        return (
+            f'db;dur={recorder.db_time * 1000:.1f};'
+            f'desc="{recorder.queries} queries", '
+            f"serializer;dur={recorder.serializer_time * 1000:.1f}, "
+            f"total;dur={duration * 1000:.1f}"
+        )
+
+    def log_slow_request(self, request, recorder, duration):
+        statements = "\n".join(
+            f"{seconds * 1000:8.1f} ms  {sql}"
+            + ("" if params is None else f"  {params!r}")
+            for seconds, sql, params in recorder.statements
+        )
+        logger.warning(
+            "Slow request %s %s: %.1f ms, %d queries, %.1f ms SQL\n%s",
+            request.method, request.get_full_path(), duration * 1000,
+            recorder.queries, recorder.db_time * 1000, statements,
+        )
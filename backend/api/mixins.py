@@ -0,0 +1,39 @@
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from recipes.catalogue import get_catalogue_version
+
+CACHE_METHODS = ("GET", "HEAD")
+
+
+class CatalogueCacheMixin:
+    """
+    Условные запросы к справочникам. ETag строится из версии справочников
+    и адреса запроса, поэтому ответ 304 отдаётся без обращения к базе.
+    """
+
+    cache_max_age = 60
+
+    def get_etag(self, request):
+        key = f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return f'"{self.basename}-{get_catalogue_version()}-{digest}"'
+
+    def patch_cache_headers(self, response, etag):
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=self.cache_max_age)
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in CACHE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return self.patch_cache_headers(HttpResponseNotModified(), etag)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.patch_cache_headers(response, etag)
+        return response
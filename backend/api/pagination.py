@@ -1,6 +1,193 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация. Страница выбирается условием по ключу
+    сортировки вместо OFFSET, поэтому время ответа не зависит от глубины.
+    Общее количество объектов считается только при count=true.
+    Ключом служит сортировка queryset (например, по популярности или
+    релевантности поиска), а без явной сортировки — ordering.
+    """
+
+    ordering = ("-pub_date", "-id")
+    page_size = LimitPageNumberPagination.page_size
+    page_size_query_param = "limit"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Неверный курсор."
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param, "")
+        if value.isdigit() and int(value) > 0:
+            return min(int(value), self.max_page_size)
+        return self.page_size
+
+    def get_queryset_ordering(self, queryset):
+        """
+        Сортировка queryset, дополненная первичным ключом,
+        чтобы ключ курсора был уникальным.
+        """
+        ordering = list(queryset.query.order_by) or list(self.ordering)
+        if any(not isinstance(name, str) for name in ordering):
+            raise ValueError("Keyset pagination needs field name ordering")
+        if ordering[-1].lstrip("-") not in ("id", "pk"):
+            ordering.append("-id" if ordering[-1].startswith("-") else "id")
+        return ordering
+
+    def get_field(self, queryset, name):
+        """Поле модели или аннотации для разбора значения из курсора."""
+        name = name.lstrip("-")
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == "pk":
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({"p": [str(value) for value in position],
+                           "o": self.ordering, "r": reverse})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, queryset, value):
+        """Позиция и направление из курсора, пустой курсор — первая страница."""
+        if not value:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(value.encode()))
+            # Курсор другой сортировки не подходит к этому запросу
+            if data["o"] != self.ordering:
+                raise ValueError
+            position = [
+                self.get_field(queryset, name).to_python(item)
+                for name, item in zip(self.ordering, data["p"])
+            ]
+            if len(position) != len(self.ordering):
+                raise ValueError
+            return position, bool(data["r"])
+        except (binascii.Error, KeyError, TypeError, ValueError,
+                ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position(self, instance):
+        return [getattr(instance, name.lstrip("-")) for name in self.ordering]
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return [
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        ]
+
+    def build_filter(self, ordering, position):
+        """Условие «строго после позиции» для составного ключа сортировки."""
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, position):
+            lookup = "lt" if name.startswith("-") else "gt"
+            field = name.lstrip("-")
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_queryset_ordering(queryset)
+        position, reverse = self.decode_cursor(
+            queryset,
+            request.query_params.get(self.cursor_query_param),
+        )
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "true":
+            self.count = queryset.order_by().count()
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        deferred, defer = queryset.query.deferred_loading
+        if not defer:
+            # Значения ключа нужны для ссылок на соседние страницы
+            queryset = queryset.only(*deferred, *(
+                name.lstrip("-") for name in ordering
+                if name.lstrip("-") not in queryset.query.annotations
+            ))
+        if position is not None:
+            queryset = queryset.filter(self.build_filter(ordering, position))
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.page = page
+        return page
+
+    def get_link(self, position, reverse):
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(position, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_link(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        response = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response)
+
+
+class IdKeysetPagination(KeysetPagination):
+    ordering = ("id",)
+
+
+class RecipePagination(BasePagination):
+    """
+    Пагинация page/limit, совместимая с фронтендом.
+    При наличии параметра cursor (пустой — первая страница)
+    используется курсорная пагинация.
+    """
+
+    page_number_class = LimitPageNumberPagination
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.paginator = self.keyset_class()
+        else:
+            self.paginator = self.page_number_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+
+class SubscriptionPagination(RecipePagination):
+    keyset_class = IdKeysetPagination
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from . import json_backends
+from .renderers import FastJSONRenderer
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на самой быстрой из установленных библиотек JSON.
+    Тело запроса разбирается из байтов без промежуточного декодирования,
+    что важно для изображений в base64.
+    """
+
+    renderer_class = FastJSONRenderer
+    backend = json_backends.BACKEND
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if self.backend == "json" or encoding.lower() not in (
+                "utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        _, loads, error = json_backends.BACKENDS[self.backend]
+        try:
+            return loads(stream.read())
+        except error as exc:
+            raise ParseError(f"JSON parse error - {exc}")
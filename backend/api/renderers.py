@@ -0,0 +1,26 @@
+from rest_framework.renderers import JSONRenderer
+
+from . import json_backends
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на самой быстрой из установленных библиотек JSON
+    (orjson, ujson). Без них, а также для ответов с отступами
+    используется стандартный модуль json.
+    """
+
+    backend = json_backends.BACKEND
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (self.backend == "json" or indent is not None
+                or self.ensure_ascii or not self.compact):
+            return super().render(data, accepted_media_type, renderer_context)
+        dumps = json_backends.BACKENDS[self.backend][0]
+        ret = dumps(data, self.encoder_class().default)
+        # Как и JSONRenderer, экранируем U+2028 и U+2029 для JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029")
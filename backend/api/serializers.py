@@ -1,13 +1,74 @@
-from django.shortcuts import get_object_or_404
 from django.db import transaction
-from drf_extra_fields.fields import Base64ImageField
+from django.http import Http404
 from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.recipe_cache import get_recipes_data
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from users.models import Follow, User
 
+from .fields import Base64ImageField, RecipeImageField
 
-class CustomUserSerializer(serializers.ModelSerializer):
+BATCH_SIZE = 100
+
+
+def parse_field_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def get_requested_fields(request, names):
+    """
+    Имена из names, выбранные параметрами запроса fields и omit
+    (через запятую), или None, если параметры не заданы.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if "fields" not in params and "omit" not in params:
+        return None
+    fields = parse_field_names(params.get("fields", ""))
+    omit = parse_field_names(params.get("omit", ""))
+    return [
+        name for name in names
+        if (not fields or name in fields) and name not in omit
+    ]
+
+
+class SparseFieldsMixin:
+    """
+    Ограничивает поля представления аргументом fields или, для корневого
+    сериализатора, параметрами запроса fields и omit.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        self.requested_fields = fields
+        super().__init__(*args, **kwargs)
+
+    def is_root(self):
+        return self.parent is None or (
+            self.parent is self.root
+            and isinstance(self.parent, serializers.ListSerializer)
+        )
+
+    @property
+    def selected_fields(self):
+        """Выбранные имена полей или None, если нужны все."""
+        if self.requested_fields is not None:
+            return self.requested_fields
+        if not self.is_root():
+            return None
+        return get_requested_fields(
+            self.context.get("request"), self.Meta.fields)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.selected_fields
+        if selected is None:
+            return fields
+        return {name: fields[name] for name in selected if name in fields}
+
+
+class CustomUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели пользователя."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -27,10 +88,10 @@ class CustomUserSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
-        return self.context["follow"].user
+        return obj.id in self.context.get("follow", set())
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор подписок."""
     email = serializers.ReadOnlyField(source="author.email")
     id = serializers.ReadOnlyField(source="author.id")
@@ -55,21 +116,33 @@ class FollowSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(user=obj.user, author=obj.author).exists()
-
+        """Подписка принадлежит текущему пользователю."""
+        request = self.context.get("request")
+        if request is None or request.user.is_anonymous:
+            return False
+        return obj.user_id == request.user.id
 
     def get_recipes(self, obj):
-        queryset = (
-            Recipe.objects.filter(author=obj.author).order_by("-pub_date"))
-        return ShortRecipeSerializer(queryset, many=True).data
+        """Последние рецепты автора с учётом параметра recipes_limit."""
+        recipes = getattr(obj.author, "limited_recipes", None)
+        if recipes is None:
+            recipes = obj.author.recipes.order_by("-pub_date", "-id")
+            recipes_limit = self.context.get("recipes_limit")
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
+        return ShortRecipeSerializer(
+            recipes, many=True, context=self.context).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        """Количество рецептов автора."""
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
+        return obj.author.recipes.count()
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор списка рецептов."""
-    image = Base64ImageField()
+    image = RecipeImageField(size="small")
 
     class Meta:
         model = Recipe
@@ -120,14 +193,37 @@ class IngredientsRecipeSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipesReadSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Загружает отметки избранного и корзины сразу для всей страницы,
+    общая часть рецептов берётся из кеша.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, "all") else data)
+        recipe_ids = [recipe.id for recipe in recipes]
+        fields = self.child.selected_fields
+        for key, field in (
+            ("subscriptions", "is_favorited"),
+            ("shopping_cart", "is_in_shopping_cart"),
+        ):
+            membership = self.context.get(key)
+            if hasattr(membership, "load") and (
+                fields is None or field in fields
+            ):
+                membership.load(recipe_ids)
+        return get_recipes_data(
+            self.child.__class__, recipes, self.context, fields)
+
+
+class RecipesReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для рецептов (просмотр)."""
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientsRecipeSerializer(many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -143,10 +239,21 @@ class RecipesReadSerializer(serializers.ModelSerializer):
             "text",
             "cooking_time",
         )
+        list_serializer_class = RecipeListSerializer
 
     def get_user(self):
         return self.context["request"].user
 
+    def to_representation(self, recipe):
+        """
+        С флагом shared в контексте строится общая часть для кеша,
+        иначе она берётся из кеша и дополняется полями пользователя.
+        """
+        if self.context.get("shared"):
+            return super().to_representation(recipe)
+        return get_recipes_data(
+            self.__class__, [recipe], self.context, self.selected_fields)[0]
+
     def get_is_favorited(self, obj):
         return obj.id in self.context['subscriptions']
 
@@ -160,7 +267,7 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
     ingredients = IngredientsRecipeSerializer(many=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True)
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = Base64ImageField(max_length=None)
 
     class Meta:
         model = Recipe
@@ -175,17 +282,36 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
             "cooking_time",
         )
 
-    def create_amount_ingredients(self, ingredients, recipe):
-        """Создание ингредиентов в рецепте."""
-        for ingredient in ingredients:
-            current_ingredient = get_object_or_404(
-                Ingredient.objects.filter(id=ingredient['id'])[:1]
-            )
-            ing, _ = IngredientInRecipe.objects.get_or_create(
-                ingredient=current_ingredient,
-                amount=ingredient["amount"],
-            )
-            recipe.ingredients.add(ing.id)
+    def get_amount_ingredients(self, ingredients):
+        """
+        Идентификаторы записей количества ингредиентов для рецепта.
+        Недостающие записи создаются одним запросом.
+        """
+        ingredient_ids = {ingredient["id"] for ingredient in ingredients}
+        if len(Ingredient.objects.in_bulk(ingredient_ids)) != len(
+            ingredient_ids
+        ):
+            raise Http404
+        pairs = {
+            (ingredient["id"], ingredient["amount"])
+            for ingredient in ingredients
+        }
+        IngredientInRecipe.objects.bulk_create(
+            [
+                IngredientInRecipe(ingredient_id=ingredient_id, amount=amount)
+                for ingredient_id, amount in pairs
+            ],
+            ignore_conflicts=True,
+        )
+        amounts = IngredientInRecipe.objects.filter(
+            ingredient_id__in=ingredient_ids,
+            amount__in={amount for _, amount in pairs},
+        ).values_list("id", "ingredient_id", "amount")
+        return [
+            amount_id
+            for amount_id, ingredient_id, amount in amounts
+            if (ingredient_id, amount) in pairs
+        ]
 
     @transaction.atomic
     def create(self, validated_data):
@@ -193,18 +319,16 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
         recipe = Recipe.objects.create(**validated_data)
-        for tag in tags:
-            recipe.tags.set(tags)
-        self.create_amount_ingredients(ingredients, recipe)
+        recipe.tags.set(tags)
+        recipe.ingredients.add(*self.get_amount_ingredients(ingredients))
         return recipe
 
     @transaction.atomic
     def update(self, recipe, validated_data):
-        """Обновление рецепта."""
+        """Обновление рецепта. Изменяются только отличающиеся связи."""
         if "ingredients" in validated_data:
             ingredients = validated_data.pop("ingredients")
-            recipe.ingredients.clear()
-            self.create_amount_ingredients(ingredients, recipe)
+            recipe.ingredients.set(self.get_amount_ingredients(ingredients))
         if "tags" in validated_data:
             tags_data = validated_data.pop("tags")
             recipe.tags.set(tags_data)
@@ -215,8 +339,19 @@ class RecipesCreateSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
+class BatchSerializer(serializers.Serializer):
+    """Идентификаторы для пакетного добавления и удаления."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_SIZE,
+    )
+
+
 class ShortRecipe(serializers.ModelSerializer):
     """Поля ."""
+    image = RecipeImageField(size="small")
+
     class Meta:
         fields = (
             'id',
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Сбрасывает кеш токена при выходе пользователя."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, created, update_fields, **kwargs):
+    """
+    Сбрасывает кеш токенов при смене пароля, деактивации и любом другом
+    изменении пользователя, кроме отметки о входе.
+    """
+    if created or update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list("key", flat=True))
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import Follow, User
+
+RECIPES = 20
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов к /api/recipes/ не зависит от страницы и рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com", username="reader",
+            first_name="Reader", last_name="Reader", password="password",
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        authors = [
+            User.objects.create_user(
+                email=f"author{number}@example.com",
+                username=f"author{number}",
+                first_name="Author", last_name="Author", password="password",
+            )
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.user, author=authors[0])
+        tags = [
+            Tag.objects.create(
+                name=f"tag {number}", color=f"#00000{number}",
+                slug=f"tag{number}",
+            )
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f"ingredient {number}", measurement_unit="г")
+            for number in range(10)
+        ]
+        for number in range(RECIPES):
+            recipe = Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f"recipe {number}", text="text", cooking_time=10,
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            # У рецептов с разными номерами от 1 до 10 ингредиентов
+            recipe.ingredients.set([
+                IngredientInRecipe.objects.get_or_create(
+                    ingredient=ingredient, amount=number + 1)[0]
+                for ingredient in ingredients[:number % 10 + 1]
+            ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def assert_queries(self, client, cold, warm):
+        """
+        Запросы с пустым кешем и с заполненным кешем представлений
+        для страниц разного размера с рецептами от 1 до 10 ингредиентов.
+        """
+        for limit in (1, 6, RECIPES):
+            url = f"/api/recipes/?limit={limit}"
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(cold):
+                    response = client.get(url)
+                self.assertEqual(len(response.data["results"]), limit)
+                with self.assertNumQueries(warm):
+                    client.get(url)
+
+    def test_authenticated(self):
+        self.assert_queries(self.client, cold=9, warm=4)
+
+    def test_anonymous(self):
+        self.assert_queries(APIClient(), cold=5, warm=2)
+
+
+class RecipeCursorTest(TestCase):
+    """Курсорная пагинация сохраняет сортировку фильтров."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email="author@example.com", username="author",
+            first_name="Author", last_name="Author", password="password",
+        )
+        for number in range(RECIPES):
+            Recipe.objects.create(
+                author=author, name=f"recipe {number}", text="text",
+                cooking_time=10, favorites_count=number * 7 % 5,
+            )
+
+    def get_ids(self, url):
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            ids += [recipe["id"] for recipe in data["results"]]
+            url = data["next"]
+        return ids
+
+    def test_popular(self):
+        self.assertEqual(
+            self.get_ids("/api/recipes/?ordering=popular&cursor=&limit=3"),
+            self.get_ids(f"/api/recipes/?ordering=popular&limit={RECIPES}"),
+        )
+
+    def test_cursor_of_other_ordering(self):
+        data = self.client.get(
+            "/api/recipes/?ordering=popular&cursor=&limit=3").json()
+        response = self.client.get(
+            data["next"].replace("ordering=popular", ""))
+        self.assertEqual(response.status_code, 404)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import IngredientsViewSet, RecipesViewSet, TagsViewSet
+from .views import IngredientsViewSet, RecipesViewSet, TagsViewSet, metrics
 
 app_name = "api"
 
@@ -11,5 +11,6 @@ router.register("recipes", RecipesViewSet, basename="recipes")
 router.register("ingredients", IngredientsViewSet, basename="ingredients")
 
 urlpatterns = [
+    path("api/metrics/", metrics, name="metrics"),
     path("api/", include(router.urls)),
 ]
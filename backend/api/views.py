@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.http import (HttpResponse, HttpResponseForbidden,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -10,30 +12,76 @@ from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated)
 from rest_framework.response import Response
 
 from recipes.models import (Favourite, Ingredient, Recipe,
-                            IngredientInRecipe, ShoppingCart, Tag)
+                            ShoppingCart, Tag)
+from recipes.batch import (add_follows, add_recipes, remove_follows,
+                           remove_recipes)
+from recipes.catalogue import get_rendered_ingredients
+from recipes.feed import get_feed, get_recipes
+from recipes.membership import RecipeMembership
+from recipes.search import ingredient_index
+from recipes.shopping_list import get_shopping_list
 from users.models import Follow, User
+from .exporters import EXPORTERS
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import LimitPageNumberPagination
+from .metrics import registry
+from .mixins import CatalogueCacheMixin
+from .pagination import RecipePagination, SubscriptionPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (CustomUserSerializer, FollowSerializer, IngredientSerializer, RecipesReadSerializer,
+from .renderers import FastJSONRenderer
+from .serializers import (BatchSerializer, CustomUserSerializer, FollowSerializer, IngredientSerializer, RecipesReadSerializer,
                           RecipesCreateSerializer, FavouriteSerializer,
-                          TagSerializer, ShoppingCartSerializer)
+                          TagSerializer, ShoppingCartSerializer,
+                          get_requested_fields)
 from djoser.views import UserViewSet
 
+# Поля представления пользователя, хранящиеся в столбцах модели
+USER_COLUMNS = ('email', 'username', 'first_name', 'last_name')
+
 
 class UserViewSet(UserViewSet):
     """Вьюсет для модели пользователя."""
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
+    pagination_class = SubscriptionPagination
  
+    def get_queryset(self):
+        """Для выбранных параметром fields полей загружаются только их столбцы."""
+        queryset = super().get_queryset()
+        fields = get_requested_fields(
+            self.request, CustomUserSerializer.Meta.fields)
+        if fields is None or self.action not in ('list', 'retrieve'):
+            return queryset
+        return queryset.only(
+            'id', *(name for name in fields if name in USER_COLUMNS))
+
     def get_serializer_context(self):
         """Дополнительный контекст, предоставляемый классу serializer."""
-        follow = set(
-            Follow.objects.filter(user_id=self.request.user.id).values_list('author_id', flat=True))
-        data = {
-            'follow': follow,
-             }
-        return data
+        context = super().get_serializer_context()
+        context['follow'] = set()
+        fields = get_requested_fields(
+            self.request, CustomUserSerializer.Meta.fields)
+        if fields is None or 'is_subscribed' in fields:
+            context['follow'] = set(
+                Follow.objects.filter(user_id=self.request.user.id).values_list('author_id', flat=True))
+        return context
+
+    @action(
+        detail=False,
+        methods=["POST", "DELETE"],
+        url_path="subscribe",
+        url_name="subscribe-batch",
+        permission_classes=[IsAuthenticated]
+    )
+    def subscribe_batch(self, request):
+        """Подписка на несколько авторов или отписка от них."""
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            results = add_follows(request.user, ids)
+        else:
+            results = remove_follows(request.user, ids)
+        return Response({'results': results})
 
     @action(
         methods=["GET"],
@@ -43,14 +91,65 @@ class UserViewSet(UserViewSet):
 
     def subscriptions(self, request):
         """Метод для просмотра подписок на авторов."""
-        user = self.request.user
-        queryset = Follow.objects.filter(user=user)
+        queryset = self.get_subscriptions_queryset(
+            request.user,
+            get_requested_fields(request, FollowSerializer.Meta.fields)
+        )
         pages = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
-            pages, many=True, context={"request": request}
+            pages, many=True, context=self.get_follow_context()
         )
         return self.get_paginated_response(serializer.data)
 
+    def get_recipes_limit(self):
+        """Значение параметра recipes_limit или None."""
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None or not recipes_limit.isdigit():
+            return None
+        return int(recipes_limit)
+
+    def get_follow_context(self):
+        """Контекст для сериализатора подписок."""
+        context = super().get_serializer_context()
+        context['recipes_limit'] = self.get_recipes_limit()
+        return context
+
+    def get_subscriptions_queryset(self, user, fields=None):
+        """
+        Подписки пользователя: количество рецептов считается аннотацией,
+        последние рецепты всех авторов страницы подгружаются одним запросом.
+        Если заданы поля fields, загружается только нужное для них.
+        """
+        queryset = (
+            Follow.objects.filter(user=user)
+            .select_related('author')
+            .order_by('id')
+        )
+        columns = USER_COLUMNS if fields is None else [
+            name for name in fields if name in USER_COLUMNS]
+        queryset = queryset.only('user', 'author', 'author__id', *(
+            f'author__{name}' for name in columns))
+        if fields is None or 'recipes_count' in fields:
+            queryset = queryset.annotate(
+                recipes_count=Count('author__recipes'))
+        if fields is not None and 'recipes' not in fields:
+            return queryset
+        recipes = Recipe.objects.only(
+            'id', 'author_id', 'name', 'image', 'thumbnails', 'cooking_time'
+        ).order_by('-pub_date', '-id')
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(author=OuterRef('author'))
+                .order_by('-pub_date', '-id')
+                .values('id')[:recipes_limit]
+            ))
+        return queryset.prefetch_related(Prefetch(
+            'author__recipes',
+            queryset=recipes,
+            to_attr='limited_recipes'
+        ))
+
     @action(
         detail=True,
         methods=["POST", "DELETE"],
@@ -69,7 +168,11 @@ class UserViewSet(UserViewSet):
                 context={"request": request}
             )
             serializer.is_valid(raise_exception=True)
-            Follow.objects.create(user=user, author=author)
+            follow = Follow.objects.create(user=user, author=author)
+            serializer = FollowSerializer(
+                self.get_subscriptions_queryset(user).get(pk=follow.pk),
+                context=self.get_follow_context()
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
  
         if request.method == 'DELETE':
@@ -82,7 +185,7 @@ class UserViewSet(UserViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(CatalogueCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для модели ингридиента."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -91,8 +194,29 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     search_fields = ("^name",)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """
+        Автодополнение по параметру name выполняется по индексу в памяти,
+        полный список в JSON отдаётся готовым из кеша.
+        """
+        name = request.query_params.get("name")
+        if name:
+            serializer = self.get_serializer(
+                ingredient_index.search(name), many=True)
+            return Response(serializer.data)
+        if request.query_params or request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+        return HttpResponse(
+            get_rendered_ingredients(self.render_list),
+            content_type="application/json"
+        )
+
+    def render_list(self):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return FastJSONRenderer().render(serializer.data)
 
-class TagsViewSet(viewsets.ModelViewSet):
+
+class TagsViewSet(CatalogueCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для модели тега."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -101,23 +225,35 @@ class TagsViewSet(viewsets.ModelViewSet):
 
 class RecipesViewSet(viewsets.ModelViewSet):
     """Вьюсет для модели рецепта."""
-    queryset = Recipe.objects.all()
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = LimitPageNumberPagination
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        """
+        Для чтения выбираются только ключевые поля: представления рецептов
+        берутся из кеша, недостающие загружаются при сериализации.
+        """
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.only("id", "author_id", "pub_date")
+        return Recipe.objects.all()
 
     def get_serializer_context(self):
         """Дополнительный контекст, предоставляемый классу serializer."""
-        subscription = set(
-            Favourite.objects.filter(user_id=self.request.user).values_list('recipe_id', flat=True))
-        shopping_cart = set(
-            ShoppingCart.objects.filter(user_id=self.request.user).values_list('recipe_id', flat=True))
-        data = {
-            'subscriptions': subscription,
-            'shopping_cart': shopping_cart
-             }
-        return data
+        context = super().get_serializer_context()
+        if self.action in ('list', 'feed'):
+            context['image_size'] = 'medium'
+        user = self.request.user
+        context['subscriptions'] = RecipeMembership(Favourite, user)
+        context['shopping_cart'] = RecipeMembership(ShoppingCart, user)
+        context['follow'] = set()
+        fields = get_requested_fields(
+            self.request, RecipesReadSerializer.Meta.fields)
+        if user.is_authenticated and (fields is None or 'author' in fields):
+            context['follow'] = set(
+                Follow.objects.filter(user=user).values_list('author_id', flat=True))
+        return context
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -148,6 +284,20 @@ class RecipesViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def batch(self, request, model):
+        """
+        Добавление или удаление списка рецептов одним запросом к базе
+        с результатом для каждого рецепта.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            results = add_recipes(model, request.user, ids)
+        else:
+            results = remove_recipes(model, request.user, ids)
+        return Response({'results': results})
+
     @action(methods=["POST", "DELETE"],
             detail=True,
             permission_classes=[IsAuthenticated]
@@ -165,6 +315,52 @@ class RecipesViewSet(viewsets.ModelViewSet):
         """Метод для добавления/удаления из продуктовой корзины."""
         return self.add(request, pk, ShoppingCart, ShoppingCartSerializer)
 
+    @action(
+        detail=False,
+        methods=["POST", "DELETE"],
+        url_path="favorite",
+        url_name="favorite-batch",
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_batch(self, request):
+        """Пакетное добавление и удаление рецептов из избранного."""
+        return self.batch(request, Favourite)
+
+    @action(
+        detail=False,
+        methods=["POST", "DELETE"],
+        url_path="shopping_cart",
+        url_name="shopping-cart-batch",
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_batch(self, request):
+        """Пакетное добавление и удаление рецептов из корзины."""
+        return self.batch(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(get_feed(request.user))
+        serializer = self.get_serializer(get_recipes(page), many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        url_path="shopping_list",
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_list(self, request):
+        """Список покупок из корзины в JSON для предпросмотра."""
+        return Response([
+            {'name': name, 'measurement_unit': unit, 'amount': amount}
+            for name, unit, amount in get_shopping_list(request.user)
+        ])
+
     @action(
         detail=False,
         methods=["GET"],
@@ -172,29 +368,35 @@ class RecipesViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
-        """Получение и скачивание корзины."""
-        user = request.user
-        ingredients_list = (
-            IngredientInRecipe.objects.filter(
-                recipes__shopping_list_recipe__user=user
-            )
-            .values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-            )
-            .annotate(ingredient_total=Sum('amount'))
-        )
-        ingredients_list = ingredients_list.order_by('ingredient__name')
-        shopping_list = 'Список покупок: \n'
-        for ingredient in ingredients_list:
-            shopping_list += (
-                f'{ingredient["ingredient__name"]} - '
-                f'{ingredient["ingredient_total"]} '
-                f'({ingredient["ingredient__measurement_unit"]}) \n'
+        """
+        Получение и скачивание корзины.
+        Формат файла задаётся параметром file_format (по умолчанию txt).
+        """
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in EXPORTERS:
+            return Response(
+                {'errors': f'Формат {file_format} не поддерживается.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        response = HttpResponse(
-            shopping_list, content_type='text/plain; charset=utf8'
+        exporter, content_type = EXPORTERS[file_format]
+        response = StreamingHttpResponse(
+            exporter(get_shopping_list(request.user)),
+            content_type=content_type
         )
-        filename = "shopping_list.txt"
+        filename = f"shopping_list.{file_format}"
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+
+def metrics(request):
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    Если задан METRICS_TOKEN, нужен заголовок Authorization: Bearer <token>.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.META.get("HTTP_AUTHORIZATION") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
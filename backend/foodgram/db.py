@@ -0,0 +1,36 @@
+from django.db import connections
+
+
+def check_before_use(connection):
+    """
+    Подменяет ensure_connection соединения: первое обращение к базе
+    в запросе сначала проверяет постоянное соединение.
+    """
+    ensure_connection = connection.ensure_connection
+
+    def checked_ensure_connection():
+        if connection.health_check_pending:
+            connection.health_check_pending = False
+            if (connection.connection is not None
+                    and not connection.in_atomic_block
+                    and not connection.is_usable()):
+                connection.close()
+        ensure_connection()
+
+    connection.ensure_connection = checked_ensure_connection
+
+
+def check_connections(**kwargs):
+    """
+    Отмечает постоянные соединения для проверки в начале запроса.
+    Соединение, закрытое сервером или PgBouncer, закрывается и открывается
+    заново при первом обращении к базе, вместо ошибки в запросе.
+    Запросы, которые не обращаются к базе, не проверяют соединение.
+    Аналог CONN_HEALTH_CHECKS из Django 4.1.
+    """
+    for connection in connections.all():
+        if not connection.settings_dict.get("CONN_HEALTH_CHECKS"):
+            continue
+        if not hasattr(connection, "health_check_pending"):
+            check_before_use(connection)
+        connection.health_check_pending = connection.connection is not None
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -90,9 +91,39 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", default="postgres"),
         "HOST": os.getenv("DB_HOST", default="db"),
         "PORT": os.getenv("DB_PORT", default="5432"),
+        # Seconds a connection is kept open between requests, 0 closes
+        # it after every request
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", default="60")),
+        # Check that a persistent connection is alive before a request
+        # uses it, see foodgram.db
+        "CONN_HEALTH_CHECKS": os.getenv(
+            "DB_CONN_HEALTH_CHECKS", default="true").lower() == "true",
+        # Transaction pooling in PgBouncer does not support server-side
+        # cursors used by QuerySet.iterator()
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv(
+            "DB_PGBOUNCER", default="false").lower() == "true",
     }
 }
 
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND",
+    default="django.core.cache.backends.locmem.LocMemCache",
+)
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", default=""),
+    }
+}
+
+# The local memory cache is separate in every gunicorn worker: an
+# invalidation reaches only the worker that handled the write
+SHARED_CACHE = CACHE_BACKEND not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -136,6 +167,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# TTF font with Cyrillic glyphs for the PDF shopping list, the Docker
+# image installs DejaVu. Without the font the pdf format is disabled
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+# Requests slower than this many milliseconds are logged with their SQL
+SLOW_REQUEST_THRESHOLD = (
+    float(os.getenv("SLOW_REQUEST_THRESHOLD"))
+    if os.getenv("SLOW_REQUEST_THRESHOLD") else None
+)
+
+# Log SQL parameters of slow requests. They include tokens and password
+# hashes, enable for debugging only
+SLOW_REQUEST_LOG_PARAMS = os.getenv(
+    "SLOW_REQUEST_LOG_PARAMS", default="false").lower() == "true"
+
+# Subscription feed: newest recipes stored per user, and the number of
+# follows above which the feed is not stored and is merged at read time
+FEED_SIZE = int(os.getenv("FEED_SIZE", default="500"))
+FEED_MAX_FOLLOWS = int(os.getenv("FEED_MAX_FOLLOWS", default="1000"))
+
+# Bearer token required by /api/metrics/, the endpoint is open when empty
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -146,7 +203,18 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication"
+        if SHARED_CACHE
+        else "rest_framework.authentication.TokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
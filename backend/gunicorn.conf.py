@@ -0,0 +1,31 @@
+import multiprocessing
+import os
+
+# Каждый поток воркера держит своё соединение с базой (CONN_MAX_AGE),
+# поэтому число воркеров по умолчанию ограничено
+MAX_DEFAULT_WORKERS = 8
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Кеш в памяти процесса у каждого воркера свой, и сброс кеша в одном
+# воркере не виден остальным. Без общего кеша воркер по умолчанию один.
+shared_cache = os.getenv(
+    "CACHE_BACKEND", LOCAL_CACHE_BACKENDS[0]) not in LOCAL_CACHE_BACKENDS
+
+bind = os.getenv("GUNICORN_BIND", "0:8000")
+workers = int(os.getenv(
+    "GUNICORN_WORKERS",
+    min(multiprocessing.cpu_count() * 2 + 1, MAX_DEFAULT_WORKERS)
+    if shared_cache else 1,
+))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Перезапуск воркеров ограничивает рост памяти, разброс не даёт
+# им перезапуститься одновременно
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
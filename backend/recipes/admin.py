@@ -11,6 +11,7 @@ from .models import (Favourite,
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ("name", "author", "added_in_favorites")
+    list_select_related = ("author",)
     readonly_fields = ("added_in_favorites",)
     list_filter = (
         "author",
@@ -19,9 +20,10 @@ class RecipeAdmin(admin.ModelAdmin):
     )
 
     def added_in_favorites(self, obj):
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
     added_in_favorites.short_description = "Добавлено в Избранные"
+    added_in_favorites.admin_order_field = "favorites_count"
 
 
 @admin.register(Ingredient)
@@ -0,0 +1,139 @@
+from django.db import connection, transaction
+
+from users.models import Follow, User
+from .feed import add_authors, remove_authors, schedule
+from .membership import bump_version
+from .models import Favourite, Recipe, ShoppingCart
+from .shopping_list import update_shopping_list
+
+ADDED = "added"
+EXISTS = "exists"
+REMOVED = "removed"
+ABSENT = "absent"
+NOT_FOUND = "not_found"
+SELF = "self"
+
+RECIPE_COUNTERS = {
+    Favourite: "favorites_count",
+    ShoppingCart: "shopping_cart_count",
+}
+
+
+def get_results(ids, found, present, status):
+    """Результат для каждого идентификатора в порядке запроса."""
+    results = []
+    for item_id in dict.fromkeys(ids):
+        if item_id not in found:
+            item_status = NOT_FOUND
+        elif item_id in present:
+            item_status = status
+        else:
+            item_status = EXISTS if status == ADDED else ABSENT
+        results.append({"id": item_id, "status": item_status})
+    return results
+
+
+def execute_returning(sql, params):
+    """Выполняет запрос с RETURNING и возвращает множество значений."""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def insert_missing(model, user_id, field, ids):
+    """
+    Добавляет строки пользователя одним запросом, пропуская уже
+    существующие, и возвращает идентификаторы действительно добавленных.
+    Строки, добавленные параллельным запросом, не считаются добавленными.
+    """
+    if not ids:
+        return set()
+    meta = model._meta
+    quote = connection.ops.quote_name
+    user_column = quote(meta.get_field("user").column)
+    column = quote(meta.get_field(field).column)
+    values = ", ".join(["(%s, %s)"] * len(ids))
+    return execute_returning(
+        f"INSERT INTO {quote(meta.db_table)} ({user_column}, {column}) "
+        f"VALUES {values} ON CONFLICT DO NOTHING RETURNING {column}",
+        [value for item_id in ids for value in (user_id, item_id)],
+    )
+
+
+def delete_existing(model, user_id, field, ids):
+    """
+    Удаляет строки пользователя одним запросом и возвращает
+    идентификаторы действительно удалённых. Обработчики сигналов
+    удаления не вызываются.
+    """
+    if not ids:
+        return set()
+    meta = model._meta
+    quote = connection.ops.quote_name
+    user_column = quote(meta.get_field("user").column)
+    column = quote(meta.get_field(field).column)
+    placeholders = ", ".join(["%s"] * len(ids))
+    return execute_returning(
+        f"DELETE FROM {quote(meta.db_table)} WHERE {user_column} = %s "
+        f"AND {column} IN ({placeholders}) RETURNING {column}",
+        [user_id, *ids],
+    )
+
+
+def recipes_changed(model, user_id, recipe_ids, delta):
+    """То же, что делают сигналы при добавлении и удалении по одному."""
+    if not recipe_ids:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).change_counter(
+        RECIPE_COUNTERS[model], delta)
+    bump_version(model, user_id)
+    if model is ShoppingCart:
+        update_shopping_list(user_id, recipe_ids, delta)
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину одним запросом.
+    Уже добавленные рецепты пропускаются уникальным ограничением.
+    """
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list("id", flat=True))
+    added = insert_missing(model, user.id, "recipe", found)
+    recipes_changed(model, user.id, added, 1)
+    return get_results(recipe_ids, found, added, ADDED)
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Убирает рецепты из избранного или корзины одним запросом."""
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list("id", flat=True))
+    removed = delete_existing(model, user.id, "recipe", found)
+    recipes_changed(model, user.id, removed, -1)
+    return get_results(recipe_ids, found, removed, REMOVED)
+
+
+@transaction.atomic
+def add_follows(user, author_ids):
+    """Подписывает пользователя на авторов одним запросом."""
+    found = set(
+        User.objects.filter(pk__in=author_ids).values_list("id", flat=True))
+    added = insert_missing(Follow, user.id, "author", found - {user.id})
+    if added:
+        schedule(add_authors, user.id, added)
+    results = get_results(author_ids, found, added, ADDED)
+    for result in results:
+        if result["id"] == user.id:
+            result["status"] = SELF
+    return results
+
+
+@transaction.atomic
+def remove_follows(user, author_ids):
+    """Отписывает пользователя от авторов одним запросом."""
+    found = set(
+        User.objects.filter(pk__in=author_ids).values_list("id", flat=True))
+    removed = delete_existing(Follow, user.id, "author", found)
+    remove_authors(user.id, removed)
+    return get_results(author_ids, found, removed, REMOVED)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "catalogue_version"
+INGREDIENTS_KEY = "catalogue:ingredients:{}"
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def initial_version():
+    """Начальная версия больше любой выданной до потери кеша."""
+    return int(time.time() * 1000)
+
+
+def get_catalogue_version():
+    """Версия справочников тегов и ингредиентов."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, initial_version(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def increment_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, initial_version(), None)
+
+
+def bump_catalogue_version():
+    """
+    Увеличивает версию справочников при изменении тегов или ингредиентов
+    после фиксации транзакции, как и остальные сбросы кеша.
+    """
+    transaction.on_commit(increment_version)
+
+
+def get_rendered_ingredients(render):
+    """
+    Список всех ингредиентов в JSON для текущей версии справочников.
+    render вызывается, только если в кеше нет готового ответа.
+    """
+    key = INGREDIENTS_KEY.format(get_catalogue_version())
+    content = cache.get(key)
+    if content is None:
+        content = render()
+        cache.set(key, content, CACHE_TIMEOUT)
+    return content
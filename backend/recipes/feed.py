@@ -0,0 +1,197 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef, Subquery
+
+from users.models import Follow
+from .models import FeedItem, Recipe
+
+FEED_BATCH_SIZE = 1000
+
+# Один поток: изменения лент в процессе применяются по очереди
+executor = ThreadPoolExecutor(max_workers=1)
+
+logger = logging.getLogger(__name__)
+
+
+def has_feed(user_id):
+    return FeedItem.objects.filter(user_id=user_id).exists()
+
+
+def follows_many(user_id):
+    """Ленту пользователя с большим числом подписок собирает чтение."""
+    return (
+        Follow.objects.filter(user_id=user_id).count()
+        > settings.FEED_MAX_FOLLOWS
+    )
+
+
+def insert_items(items):
+    """Записывает элементы ленты пакетами по FEED_BATCH_SIZE."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == FEED_BATCH_SIZE:
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def trim_feeds(user_ids):
+    """
+    Оставляет в лентах пользователей FEED_SIZE самых новых записей
+    (и записи с той же датой, что у последней из них).
+    """
+    FeedItem.objects.filter(
+        user_id__in=user_ids,
+        pub_date__lt=Subquery(
+            FeedItem.objects.filter(user_id=OuterRef("user_id"))
+            .order_by("-pub_date", "-id")
+            .values("pub_date")[settings.FEED_SIZE - 1:settings.FEED_SIZE]
+        ),
+    ).delete()
+
+
+def author_items(user_id, author_ids, since=None):
+    """Не больше FEED_SIZE самых новых рецептов авторов, начиная с since."""
+    recipes = Recipe.objects.filter(author_id__in=author_ids)
+    if since is not None:
+        recipes = recipes.filter(pub_date__gte=since)
+    recipes = recipes.order_by("-pub_date", "-id").values_list(
+        "id", "author_id", "pub_date")[:settings.FEED_SIZE]
+    for recipe_id, author_id, pub_date in recipes.iterator(FEED_BATCH_SIZE):
+        yield FeedItem(user_id=user_id, recipe_id=recipe_id,
+                       author_id=author_id, pub_date=pub_date)
+
+
+def rebuild_feed(user_id):
+    """
+    Заново заполняет ленту пользователя самыми новыми рецептами
+    его авторов. Лента пользователя с большим числом подписок
+    не хранится.
+    """
+    FeedItem.objects.filter(user_id=user_id).delete()
+    if follows_many(user_id):
+        return
+    insert_items(author_items(
+        user_id,
+        Follow.objects.filter(user_id=user_id).values("author_id"),
+    ))
+
+
+def fan_out_recipe(recipe):
+    """
+    Добавляет новый рецепт в ленты подписчиков автора.
+    Пустая лента не заполняется: её заменяет выборка при чтении.
+    """
+    followers = Follow.objects.filter(author_id=recipe.author_id).filter(
+        Exists(FeedItem.objects.filter(user_id=OuterRef("user_id")))
+    ).values_list("user_id", flat=True)
+    batch = []
+    for user_id in followers.iterator(FEED_BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == FEED_BATCH_SIZE:
+            add_recipe(recipe, batch)
+            batch = []
+    if batch:
+        add_recipe(recipe, batch)
+
+
+def add_recipe(recipe, user_ids):
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, recipe_id=recipe.pk,
+                     author_id=recipe.author_id, pub_date=recipe.pub_date)
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+    trim_feeds(user_ids)
+
+
+def add_authors(user_id, author_ids):
+    """
+    Добавляет в ленту рецепты новых авторов, если подписка ещё есть.
+    В заполненную ленту попадают только рецепты не старше её
+    последней записи, чтобы в ней не было пропусков.
+    """
+    if not has_feed(user_id) or follows_many(user_id):
+        rebuild_feed(user_id)
+        return
+    feed = FeedItem.objects.filter(user_id=user_id)
+    since = None
+    if feed.count() >= settings.FEED_SIZE:
+        since = feed.order_by("pub_date", "id").values_list(
+            "pub_date", flat=True).first()
+    insert_items(author_items(
+        user_id,
+        Follow.objects.filter(
+            user_id=user_id, author_id__in=author_ids
+        ).values("author_id"),
+        since,
+    ))
+    trim_feeds([user_id])
+
+
+def remove_authors(user_id, author_ids):
+    """Убирает из ленты рецепты авторов, от которых пользователь отписался."""
+    FeedItem.objects.filter(
+        user_id=user_id, author_id__in=author_ids).delete()
+
+
+def run_in_background(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception("Feed update %s failed", function.__name__)
+    finally:
+        close_old_connections()
+
+
+def schedule(function, *args):
+    """
+    Выполняет изменение лент в фоновом потоке после фиксации транзакции,
+    вне запроса, который его вызвал.
+    """
+    transaction.on_commit(
+        lambda: executor.submit(run_in_background, function, *args))
+
+
+def add_follow(follow):
+    """Добавляет в ленту рецепты нового автора."""
+    schedule(add_authors, follow.user_id, [follow.author_id])
+
+
+def remove_follow(follow):
+    """Убирает из ленты рецепты автора, от которого пользователь отписался."""
+    remove_authors(follow.user_id, [follow.author_id])
+
+
+def get_feed(user):
+    """
+    Лента пользователя, упорядоченная по -pub_date, -id.
+    Готовая лента хранит FEED_SIZE последних рецептов и читается
+    по индексу (user, -pub_date, -id) за время, не зависящее от числа
+    подписок. Пока лента не заполнена, и у пользователей больше чем
+    с FEED_MAX_FOLLOWS подписками, рецепты подписок выбираются
+    и сливаются при чтении по индексу (-pub_date, -id).
+    """
+    if has_feed(user.id):
+        return FeedItem.objects.filter(user=user).order_by("-pub_date", "-id")
+    return Recipe.objects.filter(
+        author__in=Follow.objects.filter(user=user).values("author_id")
+    ).only("id", "author_id", "pub_date").order_by("-pub_date", "-id")
+
+
+def get_recipes(page):
+    """
+    Рецепты страницы ленты независимо от способа её получения.
+    Для сериализации через кеш представлений достаточно идентификаторов.
+    """
+    return [
+        Recipe(id=item.recipe_id) if isinstance(item, FeedItem) else item
+        for item in page
+    ]
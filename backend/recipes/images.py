@@ -0,0 +1,117 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps, features
+
+from .models import Recipe
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+ALLOWED_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+THUMBNAIL_SIZES = {
+    "small": 320,
+    "medium": 640,
+}
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_DIR = "recipes/thumbnails"
+# Задача, которая не создала миниатюры за это время, считается потерянной
+THUMBNAIL_RETRY_DELAY = 60
+SCHEDULED_KEY = "thumbnails_scheduled:{}"
+# Ключ в thumbnails рецепта, изображение которого не удалось обработать.
+# Такие рецепты не перезапускаются при чтении, только командой
+# generate_thumbnails.
+FAILED = "failed"
+# Ошибки чтения изображения, которые не исправятся повтором
+IMAGE_ERRORS = (OSError, Image.DecompressionBombError)
+
+logger = logging.getLogger(__name__)
+
+# Отправляется после сохранения миниатюр, аргумент recipe_id
+thumbnails_created = Signal()
+
+executor = ThreadPoolExecutor(max_workers=2)
+
+
+def make_thumbnail(image, size):
+    """Уменьшенная копия изображения в компактном формате."""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((size, size), Image.LANCZOS)
+    if thumbnail.mode not in ("RGB", "RGBA"):
+        thumbnail = thumbnail.convert("RGBA")
+    if THUMBNAIL_FORMAT == "JPEG" and thumbnail.mode == "RGBA":
+        thumbnail = thumbnail.convert("RGB")
+    buffer = io.BytesIO()
+    thumbnail.save(
+        buffer, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_thumbnails(recipe_id):
+    """
+    Создаёт миниатюры изображения рецепта и сохраняет их имена.
+    Если изображение не читается, в thumbnails сохраняется ошибка.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only("image").first()
+    if recipe is None or not recipe.image:
+        return {}
+    try:
+        with recipe.image.open("rb") as file:
+            image = ImageOps.exif_transpose(Image.open(file))
+            image.load()
+    except IMAGE_ERRORS as error:
+        Recipe.objects.filter(
+            pk=recipe_id, image=recipe.image.name, thumbnails={}
+        ).update(thumbnails={FAILED: str(error)})
+        raise
+    stem = PurePosixPath(recipe.image.name).stem
+    extension = THUMBNAIL_FORMAT.lower().replace("jpeg", "jpg")
+    thumbnails = {}
+    for size_name, size in THUMBNAIL_SIZES.items():
+        thumbnails[size_name] = recipe.image.storage.save(
+            f"{THUMBNAIL_DIR}/{stem}_{size_name}.{extension}",
+            ContentFile(make_thumbnail(image, size)),
+        )
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name).update(thumbnails=thumbnails)
+    if updated:
+        thumbnails_created.send(sender=Recipe, recipe_id=recipe_id)
+    return thumbnails
+
+
+def run_in_background(recipe_id):
+    try:
+        generate_thumbnails(recipe_id)
+    except Exception:
+        logger.exception("Thumbnails of recipe %s failed", recipe_id)
+    finally:
+        close_old_connections()
+
+
+def submit_thumbnails(recipe_id):
+    cache.set(SCHEDULED_KEY.format(recipe_id), True, THUMBNAIL_RETRY_DELAY)
+    executor.submit(run_in_background, recipe_id)
+
+
+def schedule_thumbnails(recipe_id):
+    """Ставит создание миниатюр в очередь после фиксации транзакции."""
+    transaction.on_commit(lambda: submit_thumbnails(recipe_id))
+
+
+def retry_thumbnails(recipe_id):
+    """
+    Снова ставит в очередь создание миниатюр рецепта, у которого их нет.
+    Очередь живёт в памяти воркера и теряется при его перезапуске,
+    поэтому чтение рецепта без миниатюр запускает задачу повторно,
+    не чаще раза в THUMBNAIL_RETRY_DELAY секунд.
+    """
+    if cache.add(
+        SCHEDULED_KEY.format(recipe_id), True, THUMBNAIL_RETRY_DELAY
+    ):
+        executor.submit(run_in_background, recipe_id)
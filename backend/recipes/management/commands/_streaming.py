@@ -0,0 +1,36 @@
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """
+    Поэлементно читает JSON-массив верхнего уровня из файла,
+    не загружая файл в память целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("Файл должен содержать JSON-массив.")
+    position = 1
+    eof = False
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            end = None
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError("Файл содержит некорректный JSON-массив.")
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+        position = end
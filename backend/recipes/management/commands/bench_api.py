@@ -0,0 +1,196 @@
+import json
+import platform
+import time
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.metrics import Recorder
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[rank - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main API endpoints in-process with the Django test "
+        "client and write latency percentiles and query counts to JSON. "
+        "Run generate_data first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default="benchmark.json",
+            help="Where to write the results.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Results of a previous run to compare with.",
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--user",
+            help="Email of the benchmark user, the most followed "
+                 "generated user by default.",
+        )
+        parser.add_argument(
+            "--only", nargs="*", default=(),
+            help="Names of scenarios to run.",
+        )
+
+    def get_user(self, email):
+        if email:
+            return User.objects.get(email=email)
+        user = (
+            User.objects.filter(follower__isnull=False)
+            .annotate(follows=Count("follower"))
+            .order_by("-follows", "id")
+            .first()
+        )
+        if user is None:
+            raise CommandError(
+                "No users with subscriptions, run generate_data")
+        return user
+
+    def get_scenarios(self):
+        recipe = Recipe.objects.order_by("-favorites_count", "id").first()
+        if recipe is None:
+            raise CommandError("No recipes, run generate_data")
+        tags = "&".join(
+            f"tags={slug}"
+            for slug in Tag.objects.values_list("slug", flat=True)[:2]
+        )
+        ingredient = Ingredient.objects.values_list(
+            "name", flat=True).first() or ""
+        return (
+            ("recipes", "/api/recipes/", False),
+            ("recipes_auth", "/api/recipes/", True),
+            ("recipes_page_50", "/api/recipes/?page=50", True),
+            ("recipes_cursor", "/api/recipes/?cursor=&limit=20", True),
+            ("recipes_tags", f"/api/recipes/?{tags}", True),
+            ("recipes_favorited", "/api/recipes/?is_favorited=1", True),
+            ("recipes_popular", "/api/recipes/?ordering=popular", True),
+            ("recipes_author", f"/api/recipes/?author={recipe.author_id}",
+             True),
+            ("recipes_search", "/api/recipes/?search=суп", True),
+            ("recipe_detail", f"/api/recipes/{recipe.id}/", True),
+            ("feed", "/api/recipes/feed/", True),
+            ("subscriptions",
+             "/api/users/subscriptions/?recipes_limit=3", True),
+            ("users", "/api/users/", True),
+            ("user_me", "/api/users/me/", True),
+            ("tags", "/api/tags/", False),
+            ("ingredients_search",
+             f"/api/ingredients/?name={ingredient[:3]}", False),
+            ("shopping_list", "/api/recipes/download_shopping_cart/", True),
+            ("shopping_list_json", "/api/recipes/shopping_list/", True),
+        )
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(
+                f"GET {url} returned {response.status_code}")
+        return response
+
+    def run_scenario(self, client, url, repeat, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+        durations = []
+        recorder = Recorder()
+        with connection.execute_wrapper(recorder):
+            response = self.request(client, url)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.request(client, url)
+            durations.append((time.perf_counter() - started) * 1000)
+        result = {
+            "url": url,
+            "queries": recorder.queries,
+            "response_bytes": (
+                0 if response.streaming else len(response.content)),
+            "mean_ms": round(sum(durations) / len(durations), 3),
+        }
+        for percent in PERCENTILES:
+            result[f"p{percent}_ms"] = round(
+                percentile(durations, percent), 3)
+        return result
+
+    def get_meta(self, user):
+        return {
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "user": user.email,
+            "users": User.objects.count(),
+            "recipes": Recipe.objects.count(),
+            "ingredients": Ingredient.objects.count(),
+        }
+
+    def compare(self, path, results):
+        previous = json.loads(
+            Path(path).read_text(encoding="utf-8"))["results"]
+        self.stdout.write(
+            f"\n{'scenario':<22}{'p50 before':>12}{'p50 after':>12}"
+            f"{'change':>9}{'queries':>12}"
+        )
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            change = (result["p50_ms"] / before["p50_ms"] - 1) * 100
+            self.stdout.write(
+                f"{name:<22}{before['p50_ms']:>12.2f}"
+                f"{result['p50_ms']:>12.2f}{change:>+8.1f}%"
+                f"{before['queries']:>6} → {result['queries']:<4}"
+            )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {
+            False: Client(),
+            True: Client(HTTP_AUTHORIZATION=f"Token {token.key}"),
+        }
+        results = {}
+        for name, url, authenticated in self.get_scenarios():
+            if options["only"] and name not in options["only"]:
+                continue
+            result = self.run_scenario(
+                clients[authenticated], url,
+                options["repeat"], options["warmup"],
+            )
+            results[name] = result
+            self.stdout.write(
+                f"{name:<22}p50 {result['p50_ms']:8.2f} ms  "
+                f"p99 {result['p99_ms']:8.2f} ms  "
+                f"{result['queries']:3} queries"
+            )
+        Path(options["output"]).write_text(json.dumps(
+            {"meta": self.get_meta(user), "results": results},
+            ensure_ascii=False, indent=2,
+        ), encoding="utf-8")
+        self.stdout.write(self.style.SUCCESS(
+            f"Results written to {options['output']}"))
+        if options["compare"]:
+            self.compare(options["compare"], results)
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Ingredient
+from recipes.search import SEARCH_LIMIT, IngredientIndex
+
+
+class Command(BaseCommand):
+    help = "Compare ingredient autocomplete: in-memory index vs ORM query"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=20,
+            help="How many times every query is run.",
+        )
+        parser.add_argument(
+            "queries", nargs="*",
+            help="Search strings, by default prefixes of stored names.",
+        )
+
+    def measure(self, search, queries, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                search(query)
+        return (time.perf_counter() - started) / (repeat * len(queries))
+
+    def handle(self, *args, **options):
+        queries = options["queries"] or [
+            name[:length]
+            for name in Ingredient.objects.values_list("name", flat=True)[:50]
+            for length in (1, 2, 3)
+        ]
+        if not queries:
+            self.stderr.write("No ingredients to search for.")
+            return
+        index = IngredientIndex()
+        started = time.perf_counter()
+        index.get_index()
+        self.stdout.write(
+            f"index build: {(time.perf_counter() - started) * 1000:.2f} ms"
+        )
+        orm = self.measure(
+            lambda query: list(
+                Ingredient.objects.filter(name__istartswith=query)
+            ),
+            queries, options["repeat"],
+        )
+        memory = self.measure(
+            lambda query: index.search(query, SEARCH_LIMIT),
+            queries, options["repeat"],
+        )
+        self.stdout.write(f"orm istartswith: {orm * 1000:.3f} ms/query")
+        self.stdout.write(f"in-memory index: {memory * 1000:.3f} ms/query")
+        self.stdout.write(f"speedup: {orm / memory:.1f}x")
@@ -0,0 +1,107 @@
+import base64
+import io
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import json_backends
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipesReadSerializer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON rendering and parsing throughput of the DRF classes "
+        "and every installed JSON library on recipe payloads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes", type=int, default=100,
+            help="Recipes on the rendered page.",
+        )
+        parser.add_argument(
+            "--image-size", type=int, default=2 * 1024 * 1024,
+            help="Bytes of the base64 image in the parsed request body.",
+        )
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def measure(self, func, repeat):
+        func()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat
+
+    def get_page(self, limit):
+        recipes = Recipe.objects.with_related().order_by("-pub_date")[:limit]
+        if not recipes:
+            raise CommandError("No recipes, run generate_data")
+        context = {
+            "shared": True,
+            "image_size": "medium",
+            "subscriptions": frozenset(),
+            "shopping_cart": frozenset(),
+        }
+        return {
+            "count": len(recipes),
+            "next": None,
+            "previous": None,
+            "results": RecipesReadSerializer(
+                recipes, many=True, context=context).data,
+        }
+
+    def get_body(self, image_size, recipe):
+        image = base64.b64encode(os.urandom(image_size * 3 // 4)).decode()
+        return JSONRenderer().render({
+            "name": recipe["name"],
+            "text": recipe["text"],
+            "cooking_time": recipe["cooking_time"],
+            "tags": [tag["id"] for tag in recipe["tags"]],
+            "ingredients": [
+                {"id": ingredient["id"], "amount": ingredient["amount"]}
+                for ingredient in recipe["ingredients"]
+            ],
+            "image": f"data:image/png;base64,{image}",
+        })
+
+    def report(self, name, seconds, size, baseline):
+        self.stdout.write(
+            f"  {name:<10}{seconds * 1000:9.3f} ms"
+            f"{size / seconds / 2 ** 20:9.1f} MB/s"
+            f"{baseline / seconds:8.1f}x"
+        )
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        page = self.get_page(options["recipes"])
+        renderers = {"drf": JSONRenderer()}
+        parsers = {"drf": JSONParser()}
+        for backend in json_backends.BACKENDS:
+            renderers[backend] = type(
+                "Renderer", (FastJSONRenderer,), {"backend": backend})()
+            parsers[backend] = type(
+                "Parser", (FastJSONParser,), {"backend": backend})()
+
+        size = len(renderers["drf"].render(page))
+        self.stdout.write(
+            f"render: {page['count']} recipes, {size / 1024:.1f} KiB")
+        baseline = None
+        for name, renderer in renderers.items():
+            seconds = self.measure(lambda: renderer.render(page), repeat)
+            baseline = baseline or seconds
+            self.report(name, seconds, size, baseline)
+
+        body = self.get_body(options["image_size"], page["results"][0])
+        self.stdout.write(f"parse: request body {len(body) / 2 ** 20:.1f} MiB")
+        baseline = None
+        for name, parser in parsers.items():
+            seconds = self.measure(
+                lambda: parser.parse(io.BytesIO(body)), repeat)
+            baseline = baseline or seconds
+            self.report(name, seconds, len(body), baseline)
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from .bench_api import PERCENTILES, percentile
+
+DEFAULT_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?ordering=popular",
+    "/api/tags/",
+    "/api/users/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with concurrent HTTP requests and report "
+        "throughput and latency percentiles. Compare runs with different "
+        "DB_CONN_MAX_AGE, DB_PGBOUNCER and GUNICORN_* settings"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument(
+            "--path", dest="paths", action="append",
+            help="Request path, can be repeated.",
+        )
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--duration", type=float, default=20,
+            help="Seconds to run.",
+        )
+        parser.add_argument("--token", help="Authentication token.")
+        parser.add_argument("--label", default="", help="Name of the run.")
+        parser.add_argument(
+            "--output", help="Append the results to this JSON lines file.")
+
+    def worker(self, number, deadline):
+        paths = self.paths
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Token {self.token}"
+        durations = []
+        errors = 0
+        index = number
+        while time.perf_counter() < deadline:
+            request = Request(
+                self.url + paths[index % len(paths)], headers=headers)
+            index += 1
+            started = time.perf_counter()
+            try:
+                with urlopen(request, timeout=30) as response:
+                    response.read()
+            except (URLError, OSError):
+                errors += 1
+                continue
+            durations.append((time.perf_counter() - started) * 1000)
+        with self.lock:
+            self.durations += durations
+            self.errors += errors
+
+    def handle(self, *args, **options):
+        self.url = options["url"].rstrip("/")
+        self.paths = options["paths"] or DEFAULT_PATHS
+        self.token = options["token"]
+        self.lock = threading.Lock()
+        self.durations = []
+        self.errors = 0
+        concurrency = options["concurrency"]
+        started = time.perf_counter()
+        deadline = started + options["duration"]
+        with ThreadPoolExecutor(concurrency) as executor:
+            for number in range(concurrency):
+                executor.submit(self.worker, number, deadline)
+        elapsed = time.perf_counter() - started
+        if not self.durations:
+            raise CommandError(f"No successful requests to {self.url}")
+        result = {
+            "label": options["label"],
+            "created": timezone.now().isoformat(),
+            "url": self.url,
+            "paths": list(self.paths),
+            "concurrency": concurrency,
+            "requests": len(self.durations),
+            "errors": self.errors,
+            "rps": round(len(self.durations) / elapsed, 1),
+        }
+        for percent in PERCENTILES:
+            result[f"p{percent}_ms"] = round(
+                percentile(self.durations, percent), 2)
+        self.stdout.write(
+            f"{options['label'] or self.url}: {result['rps']} req/s, "
+            f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+            f"{result['requests']} requests, {result['errors']} errors"
+        )
+        if options["output"]:
+            with Path(options["output"]).open("a", encoding="utf-8") as file:
+                file.write(json.dumps(result, ensure_ascii=False) + "\n")
@@ -0,0 +1,91 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+
+User = get_user_model()
+
+WORDS = (
+    "суп", "салат", "пирог", "каша", "запеканка", "паста", "омлет",
+    "курица", "говядина", "рыба", "грибы", "сыр", "томаты", "картофель",
+    "быстрый", "домашний", "острый", "сладкий", "праздничный", "лёгкий",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark recipe full-text search. Synthetic recipes are created "
+        "inside a transaction that is rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes", type=int, default=100_000,
+            help="Number of synthetic recipes to create.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20,
+            help="How many times every query is run.",
+        )
+        parser.add_argument(
+            "queries", nargs="*", default=["суп", "курица сыр", "пирог"],
+            help="Search queries.",
+        )
+
+    def create_recipes(self, count):
+        author, _ = User.objects.get_or_create(
+            username="bench_search", email="bench_search@example.com")
+        amounts = list(IngredientInRecipe.objects.values_list("id", flat=True))
+        if not amounts:
+            ingredient = Ingredient.objects.create(
+                name="bench", measurement_unit="г")
+            amounts = [IngredientInRecipe.objects.create(
+                ingredient=ingredient, amount=1).id]
+        random.seed(0)
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=" ".join(random.sample(WORDS, 3)),
+                    text=" ".join(random.choices(WORDS, k=30)),
+                    image="recipes/bench.jpg",
+                    cooking_time=30,
+                )
+                for _ in range(count)
+            ],
+            batch_size=5000,
+        )
+        recipe_ids = Recipe.objects.filter(author=author).values_list(
+            "id", flat=True)
+        through = Recipe.ingredients.through
+        through.objects.bulk_create(
+            [
+                through(recipe_id=recipe_id, ingredientinrecipe_id=amount)
+                for recipe_id in recipe_ids.iterator()
+                for amount in random.sample(amounts, min(5, len(amounts)))
+            ],
+            batch_size=5000,
+        )
+        started = time.perf_counter()
+        Recipe.objects.filter(author=author).update_search()
+        self.stdout.write(
+            f"indexed {count} recipes in {time.perf_counter() - started:.1f} s")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_recipes(options["recipes"])
+            for query in options["queries"]:
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    found = list(Recipe.objects.search(query)[:6])
+                elapsed = (time.perf_counter() - started) / options["repeat"]
+                total = Recipe.objects.search(query).count()
+                self.stdout.write(
+                    f"{query!r}: {elapsed * 1000:.2f} ms per page, "
+                    f"{total} matches, top: {found[0].name if found else '-'}"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.images import FAILED
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+ROOT = "recipes"
+
+
+class Command(BaseCommand):
+    help = "Delete recipe images and thumbnails not referenced by any recipe"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age", type=int, default=60,
+            help="Keep files modified less than this many minutes ago.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only list files that would be deleted.",
+        )
+
+    def walk(self, storage, path):
+        directories, files = storage.listdir(path)
+        for name in files:
+            yield f"{path}/{name}"
+        for directory in directories:
+            yield from self.walk(storage, f"{path}/{directory}")
+
+    def get_referenced(self):
+        referenced = set()
+        for image, thumbnails in Recipe.objects.values_list(
+            "image", "thumbnails"
+        ).iterator():
+            referenced.add(image)
+            referenced.update(
+                name for size, name in (thumbnails or {}).items()
+                if size != FAILED
+            )
+        return referenced
+
+    def handle(self, *args, **options):
+        storage = recipe_image_storage
+        if not storage.exists(ROOT):
+            return
+        referenced = self.get_referenced()
+        threshold = timezone.now() - timedelta(minutes=options["min_age"])
+        deleted = freed = 0
+        for name in self.walk(storage, ROOT):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > threshold:
+                continue
+            size = storage.size(name)
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            deleted += 1
+            freed += size
+        action = "would be deleted" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} files ({freed} bytes) {action}"))
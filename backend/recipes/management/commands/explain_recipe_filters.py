@@ -0,0 +1,146 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from api.filters import RecipeFilter
+from recipes.models import Favourite, Recipe, ShoppingCart, Tag
+
+User = get_user_model()
+
+AUTHORS = 200
+TAGS = 12
+
+
+def table_indexes(model):
+    """Имена индексов таблицы, включая индексы уникальных ограничений."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    names = {
+        name for name, info in constraints.items()
+        if info["index"] or (info["unique"] and not info["primary_key"])
+    }
+    if connection.vendor == "sqlite":
+        # SQLite строит индексы уникальных ограничений под своими именами.
+        names.add(f"sqlite_autoindex_{table}")
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that RecipeFilter queries use the declared indexes. "
+        "Synthetic recipes are created inside a transaction that is rolled "
+        "back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes", type=int, default=50_000,
+            help="Number of synthetic recipes to create.",
+        )
+        parser.add_argument(
+            "--verbose-plans", action="store_true",
+            help="Print full query plans.",
+        )
+
+    def seed(self, count):
+        random.seed(0)
+        User.objects.bulk_create(
+            User(username=f"explain_{number}",
+                 email=f"explain_{number}@example.com")
+            for number in range(AUTHORS)
+        )
+        authors = list(User.objects.filter(username__startswith="explain_"))
+        Tag.objects.bulk_create(
+            Tag(name=f"explain {number}", color=f"#{number:06X}",
+                slug=f"explain_{number}")
+            for number in range(TAGS)
+        )
+        tags = list(Tag.objects.filter(slug__startswith="explain_"))
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=random.choice(authors),
+                    name=f"recipe {number}",
+                    text="explain",
+                    image="recipes/explain.jpg",
+                    cooking_time=30,
+                    favorites_count=random.randint(0, 100),
+                )
+                for number in range(count)
+            ),
+            batch_size=5000,
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(text="explain").values_list("id", flat=True))
+        through = Recipe.tags.through
+        through.objects.bulk_create(
+            (
+                through(recipe_id=recipe_id, tag_id=tag.id)
+                for recipe_id in recipe_ids
+                for tag in random.sample(tags, 2)
+            ),
+            batch_size=5000,
+        )
+        user = authors[0]
+        for model in (Favourite, ShoppingCart):
+            model.objects.bulk_create(
+                (
+                    model(user=author, recipe_id=recipe_id)
+                    for author in random.sample(authors, 20)
+                    for recipe_id in random.sample(recipe_ids, 50)
+                ),
+                batch_size=5000,
+                ignore_conflicts=True,
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return user, authors[1], tags
+
+    def get_checks(self, author, tags):
+        checks = [
+            ("latest", {}, {"recipe_pub_date_id_idx"}),
+            ("author", {"author": author.id}, {"recipe_author_pub_date_idx"}),
+            ("tags", {"tags": [tags[0].slug, tags[1].slug]},
+             table_indexes(Recipe.tags.through)),
+            ("favorited", {"is_favorited": True}, table_indexes(Favourite)),
+            ("shopping cart", {"is_in_shopping_cart": True},
+             table_indexes(ShoppingCart)),
+            ("popular", {"ordering": "popular"}, {"recipe_popular_idx"}),
+        ]
+        if Recipe.objects.is_postgresql():
+            checks.append(
+                ("search", {"search": "recipe"}, {"recipe_search_idx"}))
+        return checks
+
+    def explain(self, request, data):
+        queryset = RecipeFilter(
+            data, queryset=Recipe.objects.all(), request=request).qs
+        if not queryset.query.order_by:
+            queryset = queryset.order_by("-pub_date", "-id")
+        return queryset[:6].explain()
+
+    def handle(self, *args, **options):
+        failed = []
+        with transaction.atomic():
+            user, author, tags = self.seed(options["recipes"])
+            request = RequestFactory().get("/api/recipes/")
+            request.user = user
+            for name, data, expected in self.get_checks(author, tags):
+                plan = self.explain(request, data)
+                used = sorted(index for index in expected if index in plan)
+                if used:
+                    self.stdout.write(f"{name}: uses {', '.join(used)}")
+                else:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(
+                        f"{name}: none of {', '.join(sorted(expected))}"))
+                if options["verbose_plans"] or not used:
+                    self.stdout.write(plan)
+            transaction.set_rollback(True)
+        if failed:
+            raise CommandError(
+                f"Indexes are not used for: {', '.join(failed)}")
@@ -0,0 +1,308 @@
+import io
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from recipes.catalogue import bump_catalogue_version
+from recipes.feed import rebuild_feed
+from recipes.images import (THUMBNAIL_DIR, THUMBNAIL_FORMAT, THUMBNAIL_SIZES,
+                            make_thumbnail)
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCart, Tag)
+from recipes.search import ingredient_index
+from users.models import Follow
+
+User = get_user_model()
+
+PASSWORD = "benchmark"
+UNITS = ("г", "кг", "мл", "л", "шт.", "ст. л.", "ч. л.", "по вкусу")
+WORDS = (
+    "суп", "салат", "пирог", "каша", "запеканка", "паста", "омлет",
+    "курица", "говядина", "рыба", "грибы", "сыр", "томаты", "картофель",
+    "быстрый", "домашний", "острый", "сладкий", "праздничный", "лёгкий",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate reproducible synthetic users, follows, recipes, favourites "
+        "and shopping carts with bulk inserts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10_000)
+        parser.add_argument(
+            "--ingredients", type=int, default=2000,
+            help="Minimal size of the ingredient catalogue.",
+        )
+        parser.add_argument(
+            "--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--tags", type=int, default=6)
+        parser.add_argument(
+            "--follows", type=int, default=20,
+            help="Authors followed by every user.",
+        )
+        parser.add_argument(
+            "--favorites", type=int, default=30,
+            help="Favourite recipes of every user.",
+        )
+        parser.add_argument(
+            "--cart", type=int, default=5,
+            help="Recipes in the shopping cart of every user.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix", default="bench",
+            help="Prefix of generated usernames and tag slugs.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Delete previously generated data first.",
+        )
+
+    def log(self, message):
+        self.stdout.write(
+            f"{time.perf_counter() - self.started:7.1f} s  {message}")
+
+    def clear(self):
+        deleted, _ = User.objects.filter(
+            username__startswith=f"{self.prefix}_").delete()
+        Tag.objects.filter(slug__startswith=f"{self.prefix}_").delete()
+        self.log(f"deleted {deleted} objects")
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{self.prefix}_{number}",
+                    email=f"{self.prefix}_{number}@example.com",
+                    first_name="Пользователь",
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        users = list(
+            User.objects.filter(username__startswith=f"{self.prefix}_")
+            .values_list("id", flat=True)
+        )
+        self.log(f"{len(users)} users")
+        return users
+
+    def create_tags(self, count):
+        colors = set(Tag.objects.values_list("color", flat=True))
+        tags = []
+        for number in range(count):
+            color = f"#{self.random.randrange(0x1000000):06X}"
+            while color in colors:
+                color = f"#{self.random.randrange(0x1000000):06X}"
+            colors.add(color)
+            tags.append(Tag(name=f"{self.prefix} {number}", color=color,
+                            slug=f"{self.prefix}_{number}"))
+        Tag.objects.bulk_create(tags, ignore_conflicts=True)
+        return list(
+            Tag.objects.filter(slug__startswith=f"{self.prefix}_")
+            .values_list("id", flat=True)
+        )
+
+    def create_ingredients(self, count):
+        missing = count - Ingredient.objects.count()
+        if missing > 0:
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(
+                        name=f"{self.prefix} ингредиент {number}",
+                        measurement_unit=self.random.choice(UNITS),
+                    )
+                    for number in range(missing)
+                ),
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+        return list(Ingredient.objects.values_list("id", flat=True))
+
+    def create_amounts(self, ingredients, recipe_count, per_recipe):
+        """Количества ингредиентов для каждого рецепта."""
+        per_recipe = min(per_recipe, len(ingredients))
+        pairs = [
+            [
+                (ingredient, self.random.randint(1, 500))
+                for ingredient in self.random.sample(ingredients, per_recipe)
+            ]
+            for _ in range(recipe_count)
+        ]
+        IngredientInRecipe.objects.bulk_create(
+            (
+                IngredientInRecipe(ingredient_id=ingredient, amount=amount)
+                for ingredient, amount in {
+                    pair for recipe in pairs for pair in recipe}
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        ids = {
+            (ingredient, amount): amount_id
+            for amount_id, ingredient, amount in
+            IngredientInRecipe.objects.values_list(
+                "id", "ingredient_id", "amount").iterator()
+        }
+        return [[ids[pair] for pair in recipe] for recipe in pairs]
+
+    def create_image(self):
+        """
+        Одно изображение с готовыми миниатюрами для всех рецептов:
+        без файла задачи миниатюр завершались бы ошибкой.
+        """
+        image = Image.new("RGB", (800, 600), (200, 120, 60))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG")
+        storage = Recipe._meta.get_field("image").storage
+        name = storage.save(
+            f"recipes/{self.prefix}.jpg", ContentFile(buffer.getvalue()))
+        extension = THUMBNAIL_FORMAT.lower().replace("jpeg", "jpg")
+        thumbnails = {
+            size_name: storage.save(
+                f"{THUMBNAIL_DIR}/{self.prefix}_{size_name}.{extension}",
+                ContentFile(make_thumbnail(image, size)),
+            )
+            for size_name, size in THUMBNAIL_SIZES.items()
+        }
+        return name, thumbnails
+
+    def create_recipes(self, users, count):
+        image, thumbnails = self.create_image()
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=self.random.choice(users),
+                    name=" ".join(self.random.sample(WORDS, 3)).capitalize(),
+                    text=" ".join(self.random.choices(WORDS, k=40)),
+                    image=image,
+                    thumbnails=thumbnails,
+                    cooking_time=self.random.randint(5, 180),
+                )
+                for _ in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        recipes = list(
+            Recipe.objects.filter(
+                author__username__startswith=f"{self.prefix}_"
+            ).order_by("id").only("id", "pub_date")
+        )
+        # Даты публикации распределяются по последнему году,
+        # иначе у всех рецептов совпадает время вставки.
+        now = timezone.now()
+        for recipe in recipes:
+            recipe.pub_date = now - timedelta(
+                seconds=self.random.randrange(365 * 24 * 60 * 60))
+        Recipe.objects.bulk_update(
+            recipes, ["pub_date"], batch_size=1000)
+        self.log(f"{len(recipes)} recipes")
+        return [recipe.id for recipe in recipes]
+
+    def create_relations(self, recipes, tags, amounts):
+        tags_through = Recipe.tags.through
+        tags_through.objects.bulk_create(
+            (
+                tags_through(recipe_id=recipe, tag_id=tag)
+                for recipe in recipes
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, min(3, len(tags))))
+            ),
+            batch_size=self.batch_size,
+        )
+        ingredients_through = Recipe.ingredients.through
+        ingredients_through.objects.bulk_create(
+            (
+                ingredients_through(
+                    recipe_id=recipe, ingredientinrecipe_id=amount)
+                for recipe, recipe_amounts in zip(recipes, amounts)
+                for amount in recipe_amounts
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.log("tags and ingredients of recipes")
+
+    def create_memberships(self, model, users, recipes, per_user):
+        per_user = min(per_user, len(recipes))
+        model.objects.bulk_create(
+            (
+                model(user_id=user, recipe_id=recipe)
+                for user in users
+                for recipe in self.random.sample(recipes, per_user)
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.log(f"{model._meta.verbose_name_plural}: {per_user} per user")
+
+    def create_follows(self, users, per_user):
+        per_user = min(per_user, len(users) - 1)
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user, author_id=author)
+                for user in users
+                for author in [
+                    author for author in
+                    self.random.sample(users, per_user + 1)
+                    if author != user
+                ][:per_user]
+            ),
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.log(f"follows: {per_user} per user")
+
+    def handle(self, *args, **options):
+        self.started = time.perf_counter()
+        self.random = random.Random(options["seed"])
+        self.prefix = options["prefix"]
+        self.batch_size = options["batch_size"]
+        with transaction.atomic():
+            if options["clear"]:
+                self.clear()
+            users = self.create_users(options["users"])
+            tags = self.create_tags(options["tags"])
+            ingredients = self.create_ingredients(options["ingredients"])
+            amounts = self.create_amounts(
+                ingredients, options["recipes"],
+                options["ingredients_per_recipe"])
+            recipes = self.create_recipes(users, options["recipes"])
+            self.create_relations(recipes, tags, amounts)
+            self.create_follows(users, options["follows"])
+            self.create_memberships(
+                Favourite, users, recipes, options["favorites"])
+            self.create_memberships(
+                ShoppingCart, users, recipes, options["cart"])
+        # Массовая вставка не вызывает сигналы, поэтому производные
+        # данные пересчитываются отдельно.
+        generated = Recipe.objects.filter(
+            author__username__startswith=f"{self.prefix}_")
+        generated.recount()
+        self.log("counters")
+        generated.update_search()
+        self.log("search index")
+        for user in users:
+            rebuild_feed(user)
+        self.log("feeds")
+        ingredient_index.invalidate()
+        bump_catalogue_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated data with prefix {self.prefix!r}, "
+            f"password of every user: {PASSWORD}"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.images import FAILED, IMAGE_ERRORS, generate_thumbnails
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Generate missing and failed thumbnails of recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Regenerate thumbnails of every recipe.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(
+                Q(thumbnails={}) | Q(thumbnails__has_key=FAILED))
+        generated = failed = 0
+        for recipe_id in recipes.values_list("id", flat=True).iterator():
+            try:
+                if generate_thumbnails(recipe_id):
+                    generated += 1
+            except IMAGE_ERRORS as error:
+                failed += 1
+                self.stderr.write(f"Recipe {recipe_id}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Thumbnails generated for {generated} recipes"))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"Thumbnails failed for {failed} recipes"))
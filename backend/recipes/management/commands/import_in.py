@@ -1,19 +1,120 @@
 import csv
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 from recipes.models import Ingredient
+from recipes.catalogue import bump_catalogue_version
+from recipes.search import ingredient_index
+
+from ._streaming import iter_json_array
+
+DEFAULT_PATH = Path(settings.BASE_DIR) / "data" / "ingredients.csv"
+HEADER = ("name", "measurement_unit")
 
 
 class Command(BaseCommand):
-    help = "Import Users from `../data/ingredients.csv`"
-
-    def handle(self, *args, **kwargs):
-        with open("data/ingredients.csv", encoding="utf-8") as csvfile:
-            csvreader = csv.reader(csvfile)
-            next(csvreader)
-            for row in csvreader:
-                Ingredient.objects.get_or_create(
-                    name=row[0],
-                    measurement_unit=row[1],
+    help = "Import ingredients from a CSV or JSON file in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default=str(DEFAULT_PATH),
+            help="CSV (name,measurement_unit) or JSON file.",
+        )
+        parser.add_argument(
+            "--format", dest="file_format", choices=("csv", "json"),
+            help="File format, detected by extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Rows per INSERT statement.",
+        )
+        parser.add_argument(
+            "--conflicts", choices=("skip", "ignore"), default="skip",
+            help=(
+                "skip: filter out ingredients already in the database "
+                "before inserting; ignore: rely on the unique_ingredient "
+                "constraint and ON CONFLICT DO NOTHING."
+            ),
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Parse and count new ingredients without writing.",
+        )
+
+    def read_csv(self, file):
+        for row in csv.reader(file):
+            if len(row) >= 2 and tuple(row[:2]) != HEADER:
+                yield row[0], row[1]
+
+    def read_json(self, file):
+        for item in iter_json_array(file):
+            yield item["name"], item["measurement_unit"]
+
+    def read_rows(self, file, file_format):
+        """Уникальные пары (название, единица измерения) из файла."""
+        reader = self.read_json if file_format == "json" else self.read_csv
+        seen = set()
+        for name, measurement_unit in reader(file):
+            key = (name.strip(), measurement_unit.strip())
+            if key[0] and key not in seen:
+                seen.add(key)
+                yield key
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        file_format = options["file_format"] or path.suffix.lstrip(".")
+        if file_format not in ("csv", "json"):
+            raise CommandError(f"Unknown file format: {path}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        existing = set()
+        if options["conflicts"] == "skip":
+            existing = set(
+                Ingredient.objects.values_list("name", "measurement_unit")
+            )
+        started = time.perf_counter()
+        written = 0
+        try:
+            file = path.open(encoding="utf-8")
+        except OSError as error:
+            raise CommandError(error)
+        with file:
+            rows = (
+                row for row in self.read_rows(file, file_format)
+                if row not in existing
+            )
+            while True:
+                batch = list(islice(rows, options["batch_size"]))
+                if not batch:
+                    break
+                if not options["dry_run"]:
+                    Ingredient.objects.bulk_create(
+                        [
+                            Ingredient(name=name, measurement_unit=unit)
+                            for name, unit in batch
+                        ],
+                        ignore_conflicts=options["conflicts"] == "ignore",
+                    )
+                written += len(batch)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{written} rows processed, "
+                    f"{written / elapsed:.0f} rows/s"
                 )
+        if not options["dry_run"]:
+            ingredient_index.invalidate()
+            bump_catalogue_version()
+        elapsed = time.perf_counter() - started
+        if options["dry_run"]:
+            result = f"{written} new ingredients would be imported"
+        elif options["conflicts"] == "ignore":
+            result = f"{written} rows sent, duplicates ignored by database"
+        else:
+            result = f"{written} new ingredients imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{result} in {elapsed:.2f} s"
+        ))
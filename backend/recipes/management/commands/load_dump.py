@@ -0,0 +1,165 @@
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from recipes.models import Favourite, Recipe, ShoppingCart
+from recipes.catalogue import bump_catalogue_version
+from recipes.search import ingredient_index
+
+from ._streaming import iter_json_array
+
+DEFAULT_PATH = Path(settings.BASE_DIR) / "data" / "dump.json"
+
+
+def dependency_order(models):
+    """Модели в таком порядке, что связанные модели идут раньше ссылающихся."""
+    ordered = []
+
+    def visit(model, path):
+        if model in ordered or model in path:
+            return
+        for field in model._meta.concrete_fields:
+            related = field.related_model
+            if related in models and related is not model:
+                visit(related, path | {model})
+        ordered.append(model)
+
+    for model in models:
+        visit(model, frozenset())
+    return ordered
+
+
+class Command(BaseCommand):
+    help = "Load a dumpdata JSON fixture with streaming parsing and bulk inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default=str(DEFAULT_PATH),
+            help="JSON fixture produced by dumpdata.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=2000,
+            help="Objects buffered before they are written.",
+        )
+        parser.add_argument(
+            "--ignore-conflicts", action="store_true",
+            help="Skip objects whose primary key already exists.",
+        )
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS,
+            help="Database to load the fixture into.",
+        )
+
+    def insert(self, model, objects):
+        """
+        Вставляет объекты как loaddata, с raw=True: поля auto_now
+        и auto_now_add сохраняют значения из дампа, а не время загрузки.
+        """
+        meta = model._meta
+        queryset = model._base_manager.using(self.using)
+        ops = connections[self.using].ops
+        with_pk = [obj for obj in objects if obj.pk is not None]
+        without_pk = [obj for obj in objects if obj.pk is None]
+        for group, fields in (
+            (with_pk, meta.local_concrete_fields),
+            (without_pk, [
+                field for field in meta.local_concrete_fields
+                if field is not meta.pk
+            ]),
+        ):
+            if not group:
+                continue
+            size = min(
+                self.batch_size,
+                ops.bulk_batch_size(fields, group) or self.batch_size,
+            )
+            for start in range(0, len(group), size):
+                queryset._insert(
+                    group[start:start + size], fields=fields, raw=True,
+                    ignore_conflicts=self.ignore_conflicts,
+                )
+        self.models.add(model)
+
+    def flush(self, objects, relations):
+        """Записывает накопленные объекты и связи многие-ко-многим."""
+        for model in dependency_order(list(objects)):
+            self.insert(model, objects.pop(model))
+        for through in list(relations):
+            self.insert(through, relations.pop(through))
+
+    def collect_relations(self, deserialized, relations):
+        """Строки промежуточных таблиц для связей многие-ко-многим."""
+        instance = deserialized.object
+        for field_name, values in deserialized.m2m_data.items():
+            field = instance._meta.get_field(field_name)
+            through = field.remote_field.through
+            relations[through].extend(
+                through(**{
+                    field.m2m_column_name(): instance.pk,
+                    field.m2m_reverse_name(): value,
+                })
+                for value in values
+            )
+
+    def reset_sequences(self, connection):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(self.models))
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        self.using = options["database"]
+        self.batch_size = options["batch_size"]
+        self.ignore_conflicts = options["ignore_conflicts"]
+        if self.batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+        self.models = set()
+        connection = connections[self.using]
+        objects = defaultdict(list)
+        relations = defaultdict(list)
+        loaded = buffered = 0
+        started = time.perf_counter()
+        try:
+            file = path.open(encoding="utf-8")
+        except OSError as error:
+            raise CommandError(error)
+        with file, transaction.atomic(using=self.using):
+            with connection.constraint_checks_disabled():
+                for deserialized in serializers.deserialize(
+                    "python", iter_json_array(file), using=self.using
+                ):
+                    objects[deserialized.object.__class__].append(
+                        deserialized.object)
+                    self.collect_relations(deserialized, relations)
+                    buffered += 1
+                    if buffered == self.batch_size:
+                        self.flush(objects, relations)
+                        loaded += buffered
+                        buffered = 0
+                        rate = loaded / (time.perf_counter() - started)
+                        self.stdout.write(
+                            f"{loaded} objects loaded, {rate:.0f} objects/s")
+                self.flush(objects, relations)
+                loaded += buffered
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in self.models])
+            self.reset_sequences(connection)
+            if self.models & {Recipe, Favourite, ShoppingCart}:
+                Recipe.objects.using(self.using).recount()
+            if self.models & {Recipe, Recipe.ingredients.through}:
+                Recipe.objects.using(self.using).update_search()
+        ingredient_index.invalidate()
+        bump_catalogue_version()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{loaded} objects from {len(self.models)} models "
+            f"loaded in {elapsed:.2f} s"
+        ))
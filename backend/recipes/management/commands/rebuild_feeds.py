@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feed
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = "Rebuild subscription feeds of users who follow any authors"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "users", nargs="*", type=int,
+            help="Ids of users to rebuild, all followers by default.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = Follow.objects.values_list("user_id", flat=True)
+        if options["users"]:
+            user_ids = user_ids.filter(user_id__in=options["users"])
+        user_ids = list(user_ids.order_by("user_id").distinct())
+        for user_id in user_ids:
+            rebuild_feed(user_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Feeds of {len(user_ids)} users rebuilt"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Rebuild full-text search fields of all recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Recipes updated per statement.",
+        )
+
+    def handle(self, *args, **options):
+        updated = Recipe.objects.update_search(
+            batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index of {updated} recipes rebuilt"))
@@ -0,0 +1,90 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "membership_version:{}:{}"
+IDS_KEY = "membership:{}:{}:{}"
+CACHE_TIMEOUT = 24 * 60 * 60
+LARGE_SET_SIZE = 1000
+LARGE = "large"
+
+
+def get_version_key(model, user_id):
+    return VERSION_KEY.format(model._meta.model_name, user_id)
+
+
+def get_version(model, user_id):
+    """Текущая версия множества рецептов пользователя."""
+    key = get_version_key(model, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(model, user_id):
+    """
+    Новая версия делает недействительными закешированные множества.
+    Версия меняется после фиксации транзакции: иначе параллельное чтение
+    закешировало бы под новой версией ещё не зафиксированное состояние.
+    """
+    key = get_version_key(model, user_id)
+    transaction.on_commit(lambda: cache.set(key, uuid4().hex, None))
+
+
+class RecipeMembership:
+    """
+    Рецепты пользователя в избранном или корзине для полей
+    is_favorited и is_in_shopping_cart.
+    Небольшие множества кешируются целиком по версионному ключу,
+    у больших проверяются только рецепты текущей страницы одним IN-запросом.
+    """
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = set()
+        self.checked = set()
+        self.complete = user.is_anonymous
+
+    def get_cached_ids(self):
+        key = IDS_KEY.format(
+            self.model._meta.model_name,
+            self.user.id,
+            get_version(self.model, self.user.id),
+        )
+        ids = cache.get(key)
+        if ids is None:
+            ids = list(
+                self.model.objects.filter(user=self.user)
+                .values_list("recipe_id", flat=True)[:LARGE_SET_SIZE + 1]
+            )
+            ids = LARGE if len(ids) > LARGE_SET_SIZE else frozenset(ids)
+            cache.set(key, ids, CACHE_TIMEOUT)
+        return ids
+
+    def load(self, recipe_ids):
+        """Загружает принадлежность рецептов recipe_ids."""
+        if self.complete:
+            return
+        if not self.checked:
+            ids = self.get_cached_ids()
+            if ids != LARGE:
+                self.ids = ids
+                self.complete = True
+                return
+        missing = set(recipe_ids) - self.checked
+        if missing:
+            self.ids |= set(
+                self.model.objects.filter(
+                    user=self.user, recipe_id__in=missing
+                ).values_list("recipe_id", flat=True)
+            )
+            self.checked |= missing
+
+    def __contains__(self, recipe_id):
+        if not self.complete and recipe_id not in self.checked:
+            self.load([recipe_id])
+        return recipe_id in self.ids
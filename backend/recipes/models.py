@@ -1,10 +1,40 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import connections, models
 from django.db.models import UniqueConstraint
+from django.db.models.functions import Cast, Coalesce, Concat, Lower
+
+from .storage import recipe_image_storage
 
 User = get_user_model()
 
+SEARCH_CONFIG = "russian"
+
+
+class RecipeSearchIndex(GinIndex):
+    """
+    GIN-индекс по поисковому вектору в PostgreSQL.
+    В других СУБД индекс не создаётся: поиск там ищет подстроку
+    (LIKE '%term%') и всё равно просматривает всю таблицу.
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return ""
+        return super().create_sql(
+            model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return ""
+        return super().remove_sql(model, schema_editor, **kwargs)
+
 
 class Tag(models.Model):
     """Модель тега."""
@@ -49,6 +79,15 @@ class Ingredient(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ("name",)
+        constraints = (
+            UniqueConstraint(
+                fields=(
+                    "name",
+                    "measurement_unit",
+                ),
+                name="unique_ingredient",
+            ),
+        )
 
     def __str__(self):
         return f"{self.name}, {self.measurement_unit}"
@@ -88,6 +127,146 @@ class IngredientInRecipe(models.Model):
         )
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для модели рецепта."""
+
+    def change_counter(self, field_name, delta):
+        """Атомарно изменяет счётчик рецептов на delta, не опуская ниже нуля."""
+        queryset = self
+        if delta < 0:
+            queryset = queryset.filter(**{f"{field_name}__gte": -delta})
+        return queryset.update(**{field_name: models.F(field_name) + delta})
+
+    def recount(self):
+        """Пересчитывает счётчики избранного и списков покупок."""
+        return self.update(
+            favorites_count=Coalesce(
+                models.Subquery(
+                    Favourite.objects.filter(recipe=models.OuterRef("pk"))
+                    .order_by()
+                    .values("recipe")
+                    .annotate(count=models.Count("pk"))
+                    .values("count")
+                ),
+                0,
+            ),
+            shopping_cart_count=Coalesce(
+                models.Subquery(
+                    ShoppingCart.objects.filter(recipe=models.OuterRef("pk"))
+                    .order_by()
+                    .values("recipe")
+                    .annotate(count=models.Count("pk"))
+                    .values("count")
+                ),
+                0,
+            ),
+        )
+
+    def is_postgresql(self):
+        return connections[self.db].vendor == "postgresql"
+
+    def search(self, query):
+        """
+        Полнотекстовый поиск по названию, ингредиентам и описанию.
+        Результаты упорядочены по релевантности.
+        """
+        if self.is_postgresql():
+            search_query = SearchQuery(
+                query, config=SEARCH_CONFIG, search_type="websearch")
+            # ts_rank возвращает real; в double precision значение
+            # без потерь передаётся в курсор и сравнивается с ним
+            return self.filter(search_vector=search_query).annotate(
+                rank=Cast(
+                    SearchRank(models.F("search_vector"), search_query),
+                    models.FloatField(),
+                )
+            ).order_by("-rank", "-pub_date", "-id")
+        # Запасной вариант для других СУБД просматривает всю таблицу
+        query = query.casefold()
+        queryset = self
+        for term in query.split():
+            queryset = queryset.filter(search_document__contains=term)
+        return queryset.annotate(
+            rank=models.Case(
+                models.When(search_document__startswith=query.strip(),
+                            then=1),
+                default=0,
+                output_field=models.IntegerField(),
+            )
+        ).order_by("-rank", "-pub_date", "-id")
+
+    def update_search(self, batch_size=1000):
+        """Пересчитывает поисковые поля рецептов."""
+        if self.is_postgresql():
+            return self.update_search_postgresql()
+        recipes = self.order_by("pk").only("id", "name", "text")
+        updated = 0
+        for start in range(0, recipes.count(), batch_size):
+            batch = list(recipes[start:start + batch_size])
+            ingredients = defaultdict(list)
+            for recipe_id, name in Recipe.ingredients.through.objects.filter(
+                recipe_id__in=[recipe.id for recipe in batch]
+            ).values_list("recipe_id", "ingredientinrecipe__ingredient__name"):
+                ingredients[recipe_id].append(name)
+            for recipe in batch:
+                recipe.search_document = " ".join(
+                    (recipe.name, *ingredients[recipe.id], recipe.text)
+                ).casefold()
+            Recipe.objects.using(self.db).bulk_update(
+                batch, ("search_document",))
+            updated += len(batch)
+        return updated
+
+    def update_search_postgresql(self):
+        """Пересчёт поисковых полей одним UPDATE на стороне PostgreSQL."""
+        ingredients = Coalesce(
+            models.Subquery(
+                Recipe.ingredients.through.objects.filter(
+                    recipe_id=models.OuterRef("pk")
+                )
+                .order_by()
+                .values("recipe_id")
+                .annotate(names=StringAgg(
+                    "ingredientinrecipe__ingredient__name", " "))
+                .values("names")
+            ),
+            models.Value(""),
+        )
+        return Recipe.objects.using(self.db).filter(
+            pk__in=self.values("pk")
+        ).update(
+            search_document=Lower(Concat(
+                "name", models.Value(" "), ingredients,
+                models.Value(" "), "text",
+                output_field=models.TextField(),
+            )),
+            search_vector=(
+                SearchVector("name", weight="A", config=SEARCH_CONFIG)
+                + SearchVector(ingredients, weight="B", config=SEARCH_CONFIG)
+                + SearchVector("text", weight="C", config=SEARCH_CONFIG)
+            ),
+        )
+
+    def with_related(self, relations=("author", "tags", "ingredients")):
+        """
+        Подгружает автора, теги и ингредиенты рецептов
+        или только перечисленные в relations связи.
+        Число запросов не зависит от количества рецептов и ингредиентов.
+        """
+        queryset = self
+        if "author" in relations:
+            queryset = queryset.select_related("author")
+        if "tags" in relations:
+            queryset = queryset.prefetch_related("tags")
+        if "ingredients" in relations:
+            queryset = queryset.prefetch_related(models.Prefetch(
+                "ingredients",
+                queryset=IngredientInRecipe.objects.select_related(
+                    "ingredient"),
+            ))
+        return queryset
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -99,7 +278,17 @@ class Recipe(models.Model):
         verbose_name="Автор",
     )
     name = models.CharField(verbose_name="Название", max_length=200)
-    image = models.ImageField(verbose_name="Изображение", upload_to="recipes/")
+    image = models.ImageField(
+        verbose_name="Изображение",
+        upload_to="recipes/",
+        storage=recipe_image_storage,
+    )
+    thumbnails = models.JSONField(
+        verbose_name="Миниатюры изображения",
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(verbose_name="Описание")
     ingredients = models.ManyToManyField(
         IngredientInRecipe, related_name="recipes", verbose_name="Ингредиенты"
@@ -119,11 +308,51 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации рецепта", auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="Добавлено в избранное",
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name="Добавлено в список покупок",
+        default=0,
+        editable=False,
+    )
+    search_document = models.TextField(
+        verbose_name="Поисковый документ",
+        default="",
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name="Поисковый вектор",
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-id"),
+                name="recipe_pub_date_id_idx",
+            ),
+            models.Index(
+                fields=("author", "-pub_date"),
+                name="recipe_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=("-favorites_count", "-pub_date"),
+                name="recipe_popular_idx",
+            ),
+            RecipeSearchIndex(
+                fields=("search_vector",),
+                name="recipe_search_idx",
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -183,3 +412,83 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" в Список покупок'
+
+
+class FeedItem(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан пользователь.
+    Дата публикации и автор дублируются из рецепта для выборки по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации рецепта")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+        constraints = [
+            UniqueConstraint(fields=["user", "recipe"],
+                             name="unique_feed_item")
+        ]
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date", "-id"),
+                name="feed_user_pub_date_idx",
+            ),
+            models.Index(
+                fields=("user", "author"),
+                name="feed_user_author_idx",
+            ),
+        )
+
+    def __str__(self):
+        return f'"{self.recipe}" в ленте {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Строка списка покупок: сумма ингредиента по всем рецептам корзины
+    пользователя в базовой единице измерения (г, мл, ч. л.).
+    Обновляется при добавлении и удалении рецептов из корзины.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list_items",
+        verbose_name="Пользователь",
+    )
+    name = models.CharField(verbose_name="Ингредиент", max_length=200)
+    measurement_unit = models.CharField(
+        verbose_name="Единица измерения", max_length=200
+    )
+    amount = models.PositiveIntegerField(verbose_name="Количество")
+
+    class Meta:
+        ordering = ("name", "measurement_unit")
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Строки списков покупок"
+        constraints = [
+            UniqueConstraint(fields=["user", "name", "measurement_unit"],
+                             name="unique_shopping_list_item")
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.amount} ({self.measurement_unit})"
@@ -0,0 +1,140 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .images import THUMBNAIL_RETRY_DELAY, THUMBNAIL_SIZES
+from .models import Recipe
+
+# Меняется вместе с форматом представления рецепта
+CACHE_VERSION = 1
+CACHE_KEY = "recipe_data:{}:{}:{}"
+CACHE_TIMEOUT = 60 * 60
+IMAGE_SIZES = (None, *THUMBNAIL_SIZES)
+
+
+def get_cache_key(recipe_id, image_size):
+    return CACHE_KEY.format(CACHE_VERSION, recipe_id, image_size or "")
+
+
+def invalidate_recipes(recipe_ids):
+    """
+    Удаляет закешированные представления рецептов после фиксации
+    транзакции, чтобы параллельное чтение не вернуло в кеш
+    ещё не зафиксированное состояние.
+    """
+    keys = [
+        get_cache_key(recipe_id, image_size)
+        for recipe_id in recipe_ids
+        for image_size in IMAGE_SIZES
+    ]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# Столбцы и связи модели, из которых строятся поля представления
+FIELD_COLUMNS = {
+    "name": ("name",),
+    "text": ("text",),
+    "cooking_time": ("cooking_time",),
+    "image": ("image", "thumbnails"),
+}
+RELATIONS = ("author", "tags", "ingredients")
+
+
+def get_queryset(fields=None):
+    """
+    Рецепты для построения представления. Для выбранных полей
+    загружаются только нужные столбцы и связи.
+    """
+    if fields is None:
+        return Recipe.objects.with_related()
+    columns = ["id", "author_id"]
+    for name in fields:
+        columns += FIELD_COLUMNS.get(name, ())
+    relations = [name for name in RELATIONS if name in fields]
+    if "author" in relations:
+        columns.append("author")
+    return Recipe.objects.with_related(relations).only(*columns)
+
+
+def get_shared_data(serializer_class, recipe_ids, image_size, fields=None):
+    """
+    Общая для всех пользователей часть представления рецептов:
+    теги, автор, ингредиенты, текст и относительная ссылка на изображение.
+    Отсутствующие в кеше рецепты загружаются одним набором запросов.
+    Неполные представления для выбранных полей fields в кеш не попадают.
+    """
+    keys = {
+        recipe_id: get_cache_key(recipe_id, image_size)
+        for recipe_id in recipe_ids
+    }
+    cached = cache.get_many(keys.values())
+    missing = [
+        recipe_id for recipe_id, key in keys.items() if key not in cached
+    ]
+    if missing:
+        context = {
+            "shared": True,
+            "image_size": image_size,
+            "subscriptions": frozenset(),
+            "shopping_cart": frozenset(),
+        }
+        fresh = {}
+        pending = {}
+        for recipe in get_queryset(fields).filter(pk__in=missing):
+            data = serializer_class(
+                recipe, context=context, fields=fields).data
+            # Представление без миниатюр хранится недолго: если задача
+            # потерялась, следующее построение запустит её снова.
+            if fields is None and recipe.image and not recipe.thumbnails:
+                pending[keys[recipe.id]] = data
+            else:
+                fresh[keys[recipe.id]] = data
+        if fields is None:
+            cache.set_many(fresh, CACHE_TIMEOUT)
+            cache.set_many(pending, THUMBNAIL_RETRY_DELAY)
+        cached.update(fresh)
+        cached.update(pending)
+    return {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+
+
+def add_user_data(recipe_id, data, context, fields=None):
+    """
+    Дополняет общую часть полями текущего пользователя
+    и оставляет только выбранные поля fields.
+    """
+    if fields is not None:
+        data = {name: data[name] for name in fields if name in data}
+    else:
+        data = dict(data)
+    request = context.get("request")
+    user = getattr(request, "user", None)
+    if "is_favorited" in data:
+        data["is_favorited"] = recipe_id in context["subscriptions"]
+    if "is_in_shopping_cart" in data:
+        data["is_in_shopping_cart"] = recipe_id in context["shopping_cart"]
+    if "author" in data:
+        author = dict(data["author"])
+        author["is_subscribed"] = bool(
+            user is not None and user.is_authenticated
+            and author["id"] in context.get("follow", ())
+        )
+        data["author"] = author
+    if data.get("image") and request is not None:
+        data["image"] = request.build_absolute_uri(data["image"])
+    return data
+
+
+def get_recipes_data(serializer_class, recipes, context, fields=None):
+    """
+    Представления рецептов в исходном порядке. Общая часть берётся
+    из кеша, персональные поля добавляются при каждом ответе.
+    """
+    recipe_ids = [recipe.id for recipe in recipes]
+    shared = get_shared_data(
+        serializer_class, recipe_ids, context.get("image_size"), fields)
+    return [
+        add_user_data(recipe_id, shared[recipe_id], context, fields)
+        for recipe_id in recipe_ids if recipe_id in shared
+    ]
@@ -0,0 +1,98 @@
+import threading
+import time
+from bisect import bisect_left
+
+from .catalogue import get_catalogue_version
+from .models import Ingredient
+
+SEARCH_LIMIT = 50
+INDEX_TTL = 300
+
+
+class IngredientIndex:
+    """
+    Индекс для автодополнения ингредиентов в памяти процесса.
+    Названия хранятся отсортированными в нижнем регистре,
+    поиск по префиксу выполняется бинарным поиском.
+    Индекс перестраивается, когда меняется общая версия справочников,
+    поэтому ответ не старше ETag, построенного из этой версии.
+    Если кеш версий не общий, изменения в других процессах
+    подхватываются по истечении ttl секунд.
+    """
+
+    def __init__(self, ttl=INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+        self._loaded_at = 0
+
+    def invalidate(self):
+        """Сбрасывает индекс, он будет перестроен при следующем поиске."""
+        self._index = None
+
+    def _is_stale(self, index, version):
+        return (
+            index is None
+            or self._version != version
+            or time.monotonic() - self._loaded_at > self.ttl
+        )
+
+    def _load(self, version):
+        rows = sorted(
+            (name.casefold(), name, measurement_unit, pk)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        )
+        keys = [row[0] for row in rows]
+        ingredients = [
+            Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+            for _, name, measurement_unit, pk in rows
+        ]
+        self._index = (keys, ingredients)
+        self._version = version
+        self._loaded_at = time.monotonic()
+        return keys, ingredients
+
+    def get_index(self):
+        """
+        Отсортированные ключи и соответствующие им ингредиенты.
+        Индекс читается в локальную переменную один раз: invalidate
+        из другого потока может сбросить self._index в любой момент.
+        """
+        # Версия читается до загрузки: индекс не старше неё
+        version = get_catalogue_version()
+        index = self._index
+        if self._is_stale(index, version):
+            with self._lock:
+                index = self._index
+                if self._is_stale(index, version):
+                    index = self._load(version)
+        return index
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Ингредиенты, название которых содержит query.
+        Точные совпадения и совпадения по префиксу идут раньше
+        совпадений по подстроке.
+        """
+        query = query.strip().casefold()
+        keys, ingredients = self.get_index()
+        if not query:
+            return ingredients[:limit]
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + "\U0010ffff", start)
+        result = ingredients[start:min(end, start + limit)]
+        if len(result) == limit:
+            return result
+        for position, key in enumerate(keys):
+            if start <= position < end or query not in key:
+                continue
+            result.append(ingredients[position])
+            if len(result) == limit:
+                break
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+from .units import base_factor, base_unit, to_display
+
+User = get_user_model()
+
+UNIT_FIELD = "ingredient__measurement_unit"
+
+
+def aggregate(queryset):
+    """
+    Суммы ингредиентов в базовых единицах одним сгруппированным запросом:
+    кортежи (название, базовая единица, количество).
+    """
+    return (
+        queryset.annotate(unit=base_unit(UNIT_FIELD))
+        .values_list("ingredient__name", "unit")
+        .annotate(total=Sum(F("amount") * base_factor(UNIT_FIELD)))
+        .order_by()
+    )
+
+
+def lock_user(user_id):
+    """Изменения списка покупок одного пользователя выполняются по очереди."""
+    list(User.objects.select_for_update().filter(pk=user_id)
+         .values_list("pk", flat=True))
+
+
+def rebuild_shopping_list(user_id):
+    """Заново собирает список покупок пользователя из его корзины."""
+    ShoppingListItem.objects.filter(user_id=user_id).delete()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(
+            user_id=user_id, name=name, measurement_unit=unit, amount=total)
+        for name, unit, total in aggregate(
+            IngredientInRecipe.objects.filter(
+                recipes__shopping_list_recipe__user_id=user_id)
+        )
+    )
+
+
+@transaction.atomic
+def update_shopping_list(user_id, recipe_ids, sign):
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) ингредиенты рецептов
+    в готовом списке покупок. Список, который ещё не собран,
+    собирается целиком при добавлении или при чтении.
+    """
+    lock_user(user_id)
+    items = {
+        (item.name, item.measurement_unit): item
+        for item in ShoppingListItem.objects.filter(user_id=user_id)
+    }
+    if not items:
+        if sign > 0:
+            rebuild_shopping_list(user_id)
+        return
+    changed = []
+    created = []
+    for name, unit, total in aggregate(
+        IngredientInRecipe.objects.filter(recipes__in=recipe_ids)
+    ):
+        item = items.get((name, unit))
+        if item is not None:
+            item.amount = max(item.amount + sign * total, 0)
+            changed.append(item)
+        elif sign > 0:
+            created.append(ShoppingListItem(
+                user_id=user_id, name=name, measurement_unit=unit,
+                amount=total,
+            ))
+    ShoppingListItem.objects.bulk_update(changed, ["amount"])
+    ShoppingListItem.objects.bulk_create(created)
+    ShoppingListItem.objects.filter(user_id=user_id, amount=0).delete()
+
+
+def get_items(user_id):
+    """Строки списка покупок; несобранный список собирается из корзины."""
+    items = ShoppingListItem.objects.filter(user_id=user_id).values_list(
+        "name", "measurement_unit", "amount")
+    result = list(items)
+    if result or not ShoppingCart.objects.filter(user_id=user_id).exists():
+        return result
+    with transaction.atomic():
+        lock_user(user_id)
+        if not items.all().exists():
+            rebuild_shopping_list(user_id)
+    return list(items.all())
+
+
+def get_shopping_list(user):
+    """
+    Ингредиенты из корзины пользователя в виде кортежей
+    (название, единица измерения, количество). Одинаковые ингредиенты
+    в переводимых единицах (г и кг, мл и л, ч. л. и ст. л.) складываются.
+    """
+    for name, unit, amount in get_items(user.id):
+        yield (name, *to_display(unit, amount))
+
+
+def invalidate_shopping_lists(user_ids):
+    """Удаляет списки покупок, они будут собраны заново при чтении."""
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+
+
+def invalidate_recipe_shopping_lists(recipe_ids):
+    """Сбрасывает списки у пользователей, в корзине которых есть рецепты."""
+    invalidate_shopping_lists(set(
+        ShoppingCart.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list("user_id", flat=True)
+    ))
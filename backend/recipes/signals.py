@@ -0,0 +1,203 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from users.models import Follow
+from .models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+from .batch import RECIPE_COUNTERS
+from .catalogue import bump_catalogue_version
+from .feed import add_follow, fan_out_recipe, remove_follow, schedule
+from .images import schedule_thumbnails, thumbnails_created
+from .membership import bump_version
+from .recipe_cache import invalidate_recipes
+from .search import ingredient_index
+from .shopping_list import (invalidate_recipe_shopping_lists,
+                            update_shopping_list)
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    """Сбрасывает индекс поиска при изменении ингредиентов."""
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def invalidate_ingredient_shopping_lists(instance, created=False, **kwargs):
+    """Сбрасывает списки покупок, в которые входит ингредиент."""
+    if created:
+        return
+    invalidate_recipe_shopping_lists(
+        Recipe.objects.filter(
+            ingredients__ingredient=instance
+        ).values("id")
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта в список покупок."""
+    if created:
+        update_shopping_list(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    """Вычитает ингредиенты рецепта, пока они ещё есть в базе."""
+    update_shopping_list(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_ingredients(instance, action, reverse, pk_set,
+                                  **kwargs):
+    """
+    Сбрасывает списки покупок и обновляет поисковый индекс
+    при изменении ингредиентов рецепта.
+    """
+    if not action.startswith("post_"):
+        return
+    recipe_ids = (pk_set or ()) if reverse else [instance.pk]
+    invalidate_recipe_shopping_lists(recipe_ids)
+    invalidate_recipes(recipe_ids)
+    Recipe.objects.filter(pk__in=recipe_ids).update_search()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(instance, update_fields, **kwargs):
+    """Обновляет поисковый индекс при изменении рецепта."""
+    if update_fields is None or {"name", "text"} & set(update_fields):
+        Recipe.objects.filter(pk=instance.pk).update_search()
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search(instance, created, **kwargs):
+    """Обновляет поисковый индекс рецептов с переименованным ингредиентом."""
+    if not created:
+        Recipe.objects.filter(
+            ingredients__ingredient=instance).distinct().update_search()
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    """Увеличивает счётчик рецепта при добавлении в избранное или корзину."""
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+            RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favourite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """Уменьшает счётчик рецепта при удалении из избранного или корзины."""
+    Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+        RECIPE_COUNTERS[sender], -1)
+
+
+@receiver((post_save, post_delete), sender=Favourite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def bump_membership_version(sender, instance, **kwargs):
+    """Сбрасывает кеш избранного и корзины пользователя."""
+    bump_version(sender, instance.user_id)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_stored_image(instance, **kwargs):
+    """Запоминает сохранённое изображение рецепта до записи."""
+    instance.stored_image = None
+    if instance.pk is not None:
+        instance.stored_image = Recipe.objects.filter(
+            pk=instance.pk).values_list("image", flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def create_thumbnails(instance, created, **kwargs):
+    """
+    Сбрасывает миниатюры заменённого изображения и создаёт новые
+    вне обработки запроса. Имена сравниваются после сохранения:
+    хранилище называет файл по хешу содержимого, поэтому то же
+    изображение, загруженное заново, сохраняет свои миниатюры.
+    """
+    if instance.image.name == getattr(instance, "stored_image", None):
+        return
+    if not created and instance.thumbnails:
+        instance.thumbnails = {}
+        Recipe.objects.filter(pk=instance.pk).update(thumbnails={})
+    if instance.image:
+        schedule_thumbnails(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_catalogue(**kwargs):
+    """Новая версия справочников при изменении тегов и ингредиентов."""
+    bump_catalogue_version()
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_to_feeds(instance, created, **kwargs):
+    """Разносит новый рецепт по лентам подписчиков в фоне."""
+    if created:
+        schedule(fan_out_recipe, instance)
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_feed(instance, created, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика."""
+    if created:
+        add_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_feed(instance, **kwargs):
+    """Убирает рецепты автора из ленты отписавшегося пользователя."""
+    remove_follow(instance)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_data(instance, **kwargs):
+    """Сбрасывает кеш представления изменённого рецепта."""
+    invalidate_recipes([instance.pk])
+
+
+@receiver(thumbnails_created, sender=Recipe)
+def invalidate_recipe_thumbnails(recipe_id, **kwargs):
+    """Ссылки на изображение меняются, когда готовы миниатюры."""
+    invalidate_recipes([recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    """Сбрасывает кеш представлений рецептов при изменении их тегов."""
+    if action.startswith("post_"):
+        invalidate_recipes((pk_set or ()) if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag_recipes(instance, **kwargs):
+    """Сбрасывает кеш представлений рецептов с изменённым тегом."""
+    invalidate_recipes(
+        Recipe.objects.filter(tags=instance).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def invalidate_ingredient_recipes(instance, **kwargs):
+    """Сбрасывает кеш представлений рецептов с изменённым ингредиентом."""
+    invalidate_recipes(
+        Recipe.objects.filter(ingredients__ingredient=instance)
+        .values_list("id", flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(instance, created, update_fields, **kwargs):
+    """Сбрасывает кеш представлений рецептов при изменении автора."""
+    if created or update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_recipes(
+        Recipe.objects.filter(author=instance).values_list("id", flat=True))
@@ -0,0 +1,41 @@
+import hashlib
+import os
+from pathlib import PurePosixPath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла — хеш его содержимого.
+    Одинаковые файлы хранятся один раз,
+    повторная загрузка того же файла не пишет на диск.
+    """
+
+    def get_hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        path = PurePosixPath(name)
+        return str(path.parent / digest[:2] / f"{digest}{path.suffix.lower()}")
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_hashed_name(self.generate_filename(name), content)
+        if self.exists(name):
+            # Свежее время изменения не даёт collect_images удалить
+            # файл, на который вот-вот сошлётся рецепт
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+recipe_image_storage = ContentAddressedStorage()
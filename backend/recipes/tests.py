@@ -0,0 +1,41 @@
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core import serializers
+from django.core.management import call_command
+from django.test import TestCase
+
+from users.models import User
+from .models import Recipe
+
+
+class RecipeFilterIndexesTest(TestCase):
+    """Запросы фильтров рецептов используют объявленные индексы."""
+
+    def test_filters_use_indexes(self):
+        # Команда завершается CommandError, если индекс не используется
+        call_command("explain_recipe_filters", recipes=5000, stdout=StringIO())
+
+
+class LoadDumpTest(TestCase):
+    """Загрузка дампа сохраняет значения полей из него."""
+
+    def test_keeps_pub_date(self):
+        pub_date = datetime(2019, 5, 5, 10, 0, tzinfo=timezone.utc)
+        author = User.objects.create_user(
+            email="author@example.com", username="author",
+            first_name="Author", last_name="Author", password="password",
+        )
+        recipe = Recipe.objects.create(
+            author=author, name="recipe", text="text", cooking_time=10)
+        Recipe.objects.filter(pk=recipe.pk).update(pub_date=pub_date)
+        dump = serializers.serialize(
+            "json", [author, Recipe.objects.get(pk=recipe.pk)])
+        Recipe.objects.all().delete()
+        User.objects.all().delete()
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            file.write(dump)
+            file.flush()
+            call_command("load_dump", file.name, stdout=StringIO())
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).pub_date, pub_date)
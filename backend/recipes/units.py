@@ -0,0 +1,62 @@
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+
+# Единица измерения: (базовая единица, число базовых единиц в ней)
+UNITS = {
+    "г": ("г", 1),
+    "кг": ("г", 1000),
+    "мл": ("мл", 1),
+    "л": ("мл", 1000),
+    "ч. л.": ("ч. л.", 1),
+    "ст. л.": ("ч. л.", 3),
+}
+
+# Единицы для вывода, от крупной к мелкой
+DISPLAY_UNITS = {
+    base: sorted(
+        (
+            (unit, factor)
+            for unit, (unit_base, factor) in UNITS.items()
+            if unit_base == base
+        ),
+        key=lambda item: -item[1],
+    )
+    for base, _ in UNITS.values()
+}
+
+
+def base_unit(field):
+    """Выражение SQL: базовая единица для единицы из поля field."""
+    return Case(
+        *(
+            When(**{field: unit}, then=Value(base))
+            for unit, (base, _) in UNITS.items() if unit != base
+        ),
+        default=F(field),
+        output_field=CharField(),
+    )
+
+
+def base_factor(field):
+    """Выражение SQL: число базовых единиц в единице из поля field."""
+    return Case(
+        *(
+            When(**{field: unit}, then=Value(factor))
+            for unit, (_, factor) in UNITS.items() if factor != 1
+        ),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+
+
+def to_display(measurement_unit, amount):
+    """
+    Количество в самой крупной единице, в которой оно не меньше единицы
+    и записывается не более чем двумя знаками после запятой:
+    1250 г — 1.25 кг, 6 ч. л. — 2 ст. л., 4 ч. л. остаются как есть.
+    """
+    for unit, factor in DISPLAY_UNITS.get(measurement_unit, ()):
+        if amount >= factor and amount * 100 % factor == 0:
+            if amount % factor == 0:
+                return unit, amount // factor
+            return unit, amount / factor
+    return measurement_unit, amount
@@ -56,11 +56,7 @@ class Follow(models.Model):
     )
 
     class Meta:
-<<<<<<< HEAD
-        ordering = ('-id',)
-=======
         ordering = ("id",)
->>>>>>> 63237f0dcb846cedcb36f9f4dd8ce49573833824
         constraints = [
             UniqueConstraint(fields=["user", "author"], name="unique_follow")
         ]